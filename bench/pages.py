@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pathlib
+import re
+from typing import Final, Literal
+
+# Benchmark pages are built from the anonymized portal fixtures:
+#
+# small   - the fixture as served by the fake portal
+# typical - the fixture inside the portal chrome (menus, inline scripts)
+# huge    - a heavy portal chrome and the timetable of many sections
+
+Size = Literal["small", "typical", "huge"]
+
+FIXTURES_PATH: Final = (
+    pathlib.Path(__file__).parent.parent / "src" / "web_driver" / "fixtures"
+)
+SIZES: Final[tuple[Size, ...]] = ("small", "typical", "huge")
+
+MENU_ITEMS: Final[dict[Size, int]] = {"small": 0, "typical": 300, "huge": 3000}
+SCRIPT_LINES: Final[dict[Size, int]] = {"small": 0, "typical": 2000, "huge": 20000}
+SECTIONS: Final[dict[Size, int]] = {"small": 1, "typical": 1, "huge": 40}
+
+SLOT_SECTION = re.compile(r"\) 12 GU_")
+TABLE_ROWS = re.compile(r"(<tbody>\s*)(.*?)(\s*</tbody>)", re.S)
+
+
+def _chrome(size: Size) -> tuple[str, str]:
+    script = "".join(
+        f"function portal_{i}(event) {{ return event.target.dataset.id; }}\n"
+        for i in range(SCRIPT_LINES[size])
+    )
+    menu = "".join(
+        f'<li class="nav-item"><a class="nav-link" href="/corecampus/menu_{i}.php">'
+        f'<i class="fa fa-circle"></i><span>Menu {i}</span></a></li>'
+        for i in range(MENU_ITEMS[size])
+    )
+    return f"<script>{script}</script>", f'<ul class="nav">{menu}</ul>'
+
+
+def _wrap(html: str, size: Size) -> str:
+    script, menu = _chrome(size)
+    html = html.replace("</head>", f"{script}\n</head>", 1)
+    return html.replace("<body>", f"<body>\n{menu}", 1)
+
+
+def profile_page(size: Size) -> str:
+    return _wrap((FIXTURES_PATH / "profile.html").read_text(encoding="utf-8"), size)
+
+
+def timetable_page(size: Size) -> str:
+    html = (FIXTURES_PATH / "timetable.html").read_text(encoding="utf-8")
+
+    def repeat_rows(match: re.Match[str]) -> str:
+        rows = match[2]
+        sections = [
+            SLOT_SECTION.sub(f") {section} GU_", rows)
+            for section in range(12, 12 + SECTIONS[size])
+        ]
+        return match[1] + "\n".join(sections) + match[3]
+
+    # every section adds its own rows (and slot strings) to the
+    # alternative arrangement and the details tables
+    head, main_table, rest = html.partition("</table>")
+    return _wrap(head + main_table + TABLE_ROWS.sub(repeat_rows, rest), size)
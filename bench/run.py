@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import logging
+import pathlib
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Final, Iterator, TypedDict
+
+from utils.html_parser import (
+    ENGINES,
+    ProfileParser,
+    TimeTableParser,
+    _parse_slot,
+    _row_cells,
+    _SlotParser,
+)
+
+from .pages import SIZES, profile_page, timetable_page
+
+# python -m bench.run                 run every case and print the results
+# python -m bench.run --check         fail when a case regressed past the baseline
+# python -m bench.run --save          record the current results as the baseline
+
+BASELINE_PATH: Final = pathlib.Path(__file__).parent / "baseline.json"
+
+
+class CaseResult(TypedDict):
+    pages_per_second: float
+    rows_per_second: float
+    rows: int
+    peak_kb: float
+    retained_blocks: int
+
+
+def _slot_cells(page_source: str) -> list[str]:
+    parser = TimeTableParser(page_source)
+    return [
+        _row_cells(tr)[-1]
+        for index in (1, 2)
+        for tr in parser.get_table(index).find_all("tr")[1:]
+    ]
+
+
+def _parse_slots_uncached(cells: list[str]) -> list[Any]:
+    return [_parse_slot.__wrapped__(cell).to_dict() for cell in cells]
+
+
+def _parse_slots(cells: list[str]) -> list[Any]:
+    return [_SlotParser(cell).to_dict() for cell in cells]
+
+
+def cases() -> Iterator[tuple[str, Callable[[], Any], int]]:
+    for size in SIZES:
+        profile = profile_page(size)
+        timetable = timetable_page(size)
+
+        timetable_rows = TimeTableParser(timetable).get_rows()
+        rows = len(timetable_rows["timetable"]) + len(
+            timetable_rows["alternative_timetable"]
+        )
+        fields = len(ProfileParser(profile).get_data())
+
+        for engine in ENGINES:
+            yield (
+                f"profile/{engine}/{size}",
+                lambda page=profile, engine=engine: ProfileParser(
+                    page, engine=engine
+                ).get_data(),
+                fields,
+            )
+            yield (
+                f"timetable/{engine}/{size}",
+                lambda page=timetable, engine=engine: TimeTableParser(
+                    page, engine=engine
+                ).get_data(),
+                rows,
+            )
+
+        cells = _slot_cells(timetable)
+        yield (
+            f"slot/uncached/{size}",
+            functools.partial(_parse_slots_uncached, cells),
+            len(cells),
+        )
+        yield f"slot/cached/{size}", functools.partial(_parse_slots, cells), len(cells)
+
+
+def measure(func: Callable[[], Any], rows: int, *, min_time: float) -> CaseResult:
+    func()  # warm up caches and imports
+
+    iterations = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < min_time:
+        func()
+        iterations += 1
+
+    # tracemalloc slows everything down, so memory is measured in its own run.
+    # ``retained_blocks`` counts the blocks allocated by the run that are still
+    # held once it returned, not every allocation made along the way.
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    pages_per_second = iterations / elapsed
+    return {
+        "pages_per_second": round(pages_per_second, 2),
+        "rows_per_second": round(pages_per_second * rows, 2),
+        "rows": rows,
+        "peak_kb": round(peak / 1024, 1),
+        "retained_blocks": sum(stat.count for stat in snapshot.statistics("filename")),
+    }
+
+
+def compare(
+    results: dict[str, CaseResult],
+    baseline: dict[str, CaseResult],
+    *,
+    tolerance: float,
+) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        expected = baseline[name]
+        slowest = expected["pages_per_second"] * (1 - tolerance)
+        if result["pages_per_second"] < slowest:
+            regressions.append(
+                f"{name}: {result['pages_per_second']} pages/s, "
+                f"baseline {expected['pages_per_second']} pages/s"
+            )
+
+        largest = expected["peak_kb"] * (1 + tolerance)
+        if result["peak_kb"] > largest:
+            regressions.append(
+                f"{name}: {result['peak_kb']} KB peak, "
+                f"baseline {expected['peak_kb']} KB peak"
+            )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parsers.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with 1 when a case regressed past the baseline",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown and memory growth against the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="seconds each case is repeated for",
+    )
+    parser.add_argument(
+        "-k", dest="filter", default="", help="only run cases containing this text"
+    )
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results: dict[str, CaseResult] = {}
+    print(
+        f"{'case':<28} {'pages/s':>10} {'rows/s':>12} {'peak KB':>10} {'retained':>9}"
+    )
+    for name, func, rows in cases():
+        if args.filter not in name:
+            continue
+
+        result = results[name] = measure(func, rows, min_time=args.min_time)
+        print(
+            f"{name:<28} {result['pages_per_second']:>10.1f} "
+            f"{result['rows_per_second']:>12.1f} {result['peak_kb']:>10.1f} "
+            f"{result['retained_blocks']:>9}"
+        )
+
+    if args.save:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=4, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}, run with --save first")
+            return 1
+
+        baseline = json.loads(args.baseline.read_text())
+        if regressions := compare(results, baseline, tolerance=args.tolerance):
+            print("regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+
+        print("no regressions")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
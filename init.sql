@@ -9,6 +9,15 @@ CREATE TABLE IF NOT EXISTS students_credentials (
     UNIQUE(admission_number)
 );
 
+CREATE TABLE IF NOT EXISTS students_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admission_number TEXT NOT NULL,
+    cookies TEXT NOT NULL,
+    expires_at INTEGER NOT NULL,
+
+    UNIQUE(admission_number)
+);
+
 CREATE TABLE IF NOT EXISTS students (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     full_name TEXT NOT NULL,
@@ -61,6 +70,17 @@ CREATE TABLE IF NOT EXISTS alternative_timetable (
     UNIQUE(start_time, end_time, faculty_name, alternative_faculty_name, slot_id, class)
 );
 
+CREATE TABLE IF NOT EXISTS timetable_hashes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    class TEXT NOT NULL,
+    week TEXT NOT NULL,
+    main_hash TEXT NOT NULL,
+    alternative_hash TEXT NOT NULL,
+    details_hash TEXT NOT NULL,
+
+    UNIQUE(class, week)
+);
+
 CREATE TABLE IF NOT EXISTS courses (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     course_code TEXT NOT NULL,
@@ -92,4 +112,17 @@ CREATE TABLE IF NOT EXISTS attendance (
     UNIQUE(admission_number, class, section, course_code)
 );
 
+CREATE TABLE IF NOT EXISTS page_archive (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL,
+    admission_number TEXT NOT NULL,
+    class TEXT,
+    page_type TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+
+    UNIQUE(sha256, admission_number, page_type, fetched_at)
+);
+
+CREATE INDEX IF NOT EXISTS page_archive_lookup ON page_archive(page_type, class, fetched_at);
+
 COMMIT;
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
 import logging
+import os
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 
 from src.api import Router as APIRouter
 
@@ -17,9 +20,30 @@ logging.basicConfig(
 logging.getLogger()
 
 
-async def main():
-    app = FastAPI()
+async def replay(args: argparse.Namespace):
     api_router_instance = APIRouter()
+    await api_router_instance.init_database()
+    try:
+        replayed = await api_router_instance._replay_archive(
+            args.page, class_=args.class_, since=args.since
+        )
+    finally:
+        await api_router_instance.storage.close()
+
+    logging.info("replayed %s archived pages", replayed)
+
+
+async def main(args: argparse.Namespace):
+    if args.replay:
+        return await replay(args)
+
+    app = FastAPI()
+    # the week and day timetables are large and compress well
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    api_router_instance = APIRouter(
+        processes=args.processes if args.worker else None,
+        archive_expired=args.archive_expired,
+    )
 
     await api_router_instance.init()
     app.include_router(api_router_instance.router)
@@ -31,5 +55,48 @@ async def main():
     await server.serve()
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="scrape and parse in worker processes instead of the API process",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes used with --worker",
+    )
+    parser.add_argument(
+        "--archive-expired",
+        action="store_true",
+        help="keep the timetable rows removed by retention in archive/expired",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="re-parse the archived pages into the database instead of serving",
+    )
+    parser.add_argument(
+        "--page",
+        action="append",
+        choices=("profile", "timetable", "attendance"),
+        help="page type to replay, can be given more than once (default: all)",
+    )
+    parser.add_argument(
+        "--class",
+        dest="class_",
+        help="only replay pages of this class",
+    )
+    parser.add_argument(
+        "--since",
+        help="only replay pages fetched at or after this UTC time, e.g. 2023-12-18",
+    )
+    args = parser.parse_args()
+    args.page = tuple(args.page or ("profile", "timetable", "attendance"))
+    return args
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
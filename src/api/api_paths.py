@@ -1,14 +1,40 @@
 from __future__ import annotations
 
-import asyncio
+import json
 import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Final
 
-from utils.database import get_current_timetable, insert_credential, update_credentials
+from fastapi import Body, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.database import (
+    PORTAL_TIMEZONE,
+    delete_credentials,
+    delete_session_cookies,
+    execute_query,
+    get_attendance,
+    insert_credential,
+    to_timestamp,
+    update_credentials,
+)
 
 from .tasks import TasksLoops
 
 log = logging.getLogger("__name__")
 
+BATCH_LINES_PER_CHUNK: Final = 500
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+
+    # If-None-Match uses the weak comparison, a W/ prefix does not matter
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 
 class APIPaths(TasksLoops):
     async def _GET_index(self) -> dict[str, str]:
@@ -17,60 +43,126 @@ class APIPaths(TasksLoops):
     async def _POST_credentials(
         self, *, admission_number: str, password: str, section: int
     ) -> dict[str, str]:
-        result = await insert_credential(
-            self.database_connection,
+        result = await self.storage.write(
+            insert_credential,
             admission_number=admission_number,
             password=password,
             section=section,
         )
         if result is None:
-            await update_credentials(
-                self.database_connection,
+            await self.storage.write(
+                update_credentials,
                 admission_number=admission_number,
                 password=password,
                 section=section,
             )
-            await asyncio.gather(
-                self._update_profile(
-                    admission_number=admission_number, password=password
-                )
+            # the section may have changed
+            await self.storage.read(self.timetable_index.load_student, admission_number)
+            await self._update_student(
+                admission_number, password, ("profile", "timetable")
             )
             return {"message": "Updated"}
 
-        await asyncio.gather(
-            self._update_profile(admission_number=admission_number, password=password)
-        )
+        await self._update_student(admission_number, password, ("profile", "timetable"))
         return {"message": "Inserted"}
 
     async def _DELETE_credentials(self, *, admission_number: str) -> dict[str, str]:
-        # T_T
+        await self.storage.write(delete_session_cookies, admission_number)
 
-        script = f"""
-            BEGIN;
-            DELETE FROM students_credentials WHERE admission_number = {admission_number[:13:]};
-            DELETE FROM students WHERE admission_number = {admission_number[:13:]};
-            COMMIT;
-        """
-        log.debug("executing sql script %s", script)
-
-        cur = await self.cursor.executescript(script)
-        results = await cur.fetchall()
-        return {"message": "Deleted"} if results else {"message": "Not Found"}
+        deleted = await self.storage.write(delete_credentials, admission_number)
+        self.timetable_index.remove_student(admission_number)
+        return {"message": "Deleted"} if deleted else {"message": "Not Found"}
 
     async def _GET_credentials(self, *, admission_number: str) -> dict[str, str]:
         query = """SELECT * FROM students_credentials WHERE admission_number = ?"""
-        log.debug("executing sql query %s with args %s", query, (admission_number,))
-        cur = await self.cursor.execute(
-            query,
-            (admission_number,),
-        )
-        results = await cur.fetchall()
+        results = await self.storage.read(execute_query, query, (admission_number,))
         return {"message": "Found"} if results else {"message": "Not Found"}
 
     async def _GET_timetable(self, *, admission_number: str) -> dict:
-        return await get_current_timetable(self.database_connection, admission_number)  # type: ignore
+        if len(admission_number) > 14:
+            raise ValueError("Invalid admission number")
+
+        now = int(time.time())
+        return self.timetable_index.current(admission_number, now) or {}  # type: ignore
+
+    async def _POST_timetable_batch(
+        self, admission_numbers: list[str] = Body(...)
+    ) -> StreamingResponse:
+        # resolved up front so a re-index while streaming cannot mix versions
+        now = int(time.time())
+        results = list(self.timetable_index.current_many(admission_numbers, now))
+
+        async def lines() -> AsyncIterator[str]:
+            # one JSON line per admission number, in the order they were sent
+            for start in range(0, len(results), BATCH_LINES_PER_CHUNK):
+                yield "".join(
+                    json.dumps(
+                        {"admission_number": admission_number, "timetable": row or {}}
+                    )
+                    + "\n"
+                    for admission_number, row in results[
+                        start : start + BATCH_LINES_PER_CHUNK
+                    ]
+                )
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def _GET_timetable_week(
+        self, request: Request, *, admission_number: str, date: str | None = None
+    ) -> Response:
+        return self._timetable_response(request, admission_number, date, days=7)
+
+    async def _GET_timetable_day(
+        self, request: Request, *, admission_number: str, date: str | None = None
+    ) -> Response:
+        return self._timetable_response(request, admission_number, date, days=1)
+
+    def _timetable_response(
+        self, request: Request, admission_number: str, date: str | None, *, days: int
+    ) -> Response:
+        section = self.timetable_index.get(admission_number)
+        if section is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+
+        try:
+            day = (
+                datetime.strptime(date, "%Y-%m-%d")
+                if date
+                else datetime.now(PORTAL_TIMEZONE)
+            ).date()
+        except ValueError:
+            return JSONResponse({"message": "Invalid date"}, status_code=400)
+        if days == 7:
+            day -= timedelta(days=day.weekday())
+
+        # the version changes with the section's slots, so a client can keep
+        # its copy until the timetable of its class is ingested again
+        etag = f'"{section.version}-{day}-{days}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        start: int = to_timestamp(f"{day} 00:00:00")  # type: ignore
+        return JSONResponse(
+            section.arrangement(start, start + days * 24 * 60 * 60), headers=headers
+        )
+
+    async def _GET_timetable_stats(self) -> dict[str, int]:
+        return self.timetable_index.stats()
+
+    async def _GET_attendance(self, *, admission_number: str) -> list[dict]:
+        return await self.storage.read(get_attendance, admission_number)  # type: ignore
+
+    async def _GET_scrape_stats(self) -> dict:
+        return self.scrape_executor.stats()  # type: ignore
+
+    async def _GET_retention_stats(self) -> dict:
+        # the report of the last retention run, empty before the first one
+        return self.retention_report or {}  # type: ignore
 
     async def _GET_commit(self) -> dict[str, str]:
-        log.info("committing changes")
-        await self.database_connection.commit()
+        # writes are committed in groups by the storage writer, this only
+        # waits for the ones queued so far
+        log.info("flushing queued writes")
+        await self.storage.flush()
         return {"message": "Committed"}
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
 
-import aiosqlite
+if TYPE_CHECKING:
+    from src.web_driver.executor import ScrapeExecutor
+    from src.web_driver.pool import DriverPool
+    from utils.archive import ExpiredRowsArchive, PageArchive
+    from utils.database import SlotCache
+    from utils.storage import Storage
+    from utils.timetable_index import TimetableIndex
+    from utils.typehints import RetentionReport
 
 
 class BaseClass(ABC):
-    cursor: aiosqlite.Cursor
-    database_connection: aiosqlite.Connection
+    storage: Storage
+    driver_pool: DriverPool
+    scrape_executor: ScrapeExecutor
+    process_pool: ProcessPoolExecutor | None
+    page_archive: PageArchive
+    expired_archive: ExpiredRowsArchive | None
+    slot_cache: SlotCache
+    timetable_index: TimetableIndex
+    retention_report: RetentionReport | None
 
     @abstractmethod
     async def init(self) -> None:
@@ -1,64 +1,453 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Final, Iterable
 
-from src.web_driver.profile_driver import ProfileDriver
-from src.web_driver.time_table_driver import TimeTableDriver
-from utils.database import insert_alternative_arrangement, insert_main_timetable
-from utils.html_parser import ProfileParser, TimeTableParser
+from src.web_driver.config import SCRAPE_BACKEND
+from src.web_driver.cookies import session_expiry
+from src.web_driver.http_driver import HTTPMultiPageDriver
+from src.web_driver.multi_page_driver import MultiPageDriver
+from src.worker import scrape_student
+from utils.archive import fetched_at
+from utils.database import (
+    delete_expired_rows,
+    delete_expired_timetable_hashes,
+    delete_rows,
+    delete_session_cookies,
+    delete_timetable_hashes,
+    execute_query,
+    get_archived_pages,
+    get_credential_section,
+    get_expired_rows,
+    get_session_cookies,
+    get_timetable_hashes,
+    insert_archived_page,
+    insert_attendance,
+    insert_timetable,
+    save_session_cookies,
+    save_timetable_hashes,
+    set_archived_page_class,
+)
+from utils.html_parser import AttendanceParser, ProfileParser, TimeTableParser
 
 from .base import BaseClass
 
+if TYPE_CHECKING:
+    from src.web_driver.typehints import Cookie, PageName
+    from utils.typehints import (
+        AlternativeArrangement,
+        Arrangement,
+        AttendanceGetData,
+        ProfileType,
+        RetentionReport,
+        TimeTableGetData,
+        TimeTableHashes,
+    )
+
 log = logging.getLogger("__name__")
 
+# timetable rows older than this are removed by the retention loop
+RETENTION_PERIOD: Final[int] = 7 * 24 * 60 * 60
+RETENTION_CHUNK: Final[int] = 500
+RETENTION_TABLES: Final[tuple[str, ...]] = ("timetable", "alternative_timetable")
+
 
 class MetaClass(BaseClass):
-    async def _update_profile(self, *, admission_number: str, password: str) -> None:
-        profile = ProfileDriver(admission_number, password)
-        log.info("logging in with %s and %s", admission_number, password)
-
-        await asyncio.to_thread(profile.login)
-        query = ProfileParser(profile.download_page_source()).create_sql_query()
-        log.debug("executing sql query %s", query)
-        await self.cursor.execute(query)
-
-        log.info("committing changes")
-        await self.database_connection.commit()
-
-        profile.close()
-
-    async def _update_timetable(self, admission_number: str, password: str) -> None:
-        timetable = TimeTableDriver(admission_number, password)
-        await asyncio.to_thread(timetable.login)
-        parser = TimeTableParser(timetable.download_page_source())
-        data = parser.get_data()
-
-        functions = [
-            insert_main_timetable(self.database_connection, **data["timetable"]),
-            insert_alternative_arrangement(
-                self.database_connection, **data["alternative_timetable"]
+    async def _iter_pages(
+        self, pages: Iterable[PageName], admission_number: str, password: str
+    ) -> AsyncIterator[tuple[PageName, str]]:
+        cookies = await self.storage.read(get_session_cookies, admission_number)
+        log.info(
+            "downloading %s pages of %s with %s, stored session: %s",
+            pages,
+            admission_number,
+            SCRAPE_BACKEND,
+            cookies is not None,
+        )
+
+        new_cookies: list[Cookie]
+        try:
+            async with self.scrape_executor.session():
+                if SCRAPE_BACKEND == "http":
+                    async with HTTPMultiPageDriver(
+                        admission_number,
+                        password,
+                        pages=pages,
+                        executor=self.scrape_executor,
+                    ) as driver:
+                        async for page, page_source in driver.iter_pages(cookies):
+                            yield page, page_source
+                        new_cookies = driver.get_cookies()
+                        log.info(
+                            "scraped %s: %s bytes, %.0f ms page load",
+                            admission_number,
+                            driver.bytes_downloaded,
+                            driver.page_load_time,
+                        )
+                else:
+                    async with self.driver_pool.acquire(
+                        MultiPageDriver, admission_number, password, pages=pages
+                    ) as driver:
+                        async for page, page_source in driver.iter_pages(
+                            cookies, executor=self.scrape_executor
+                        ):
+                            yield page, page_source
+                        new_cookies = await self.scrape_executor.run(driver.get_cookies)
+                        log.info(
+                            "scraped %s: %s bytes, %.0f ms page load",
+                            admission_number,
+                            driver.bytes_downloaded,
+                            driver.page_load_time,
+                        )
+        except Exception:
+            # the stored session may be the reason, the next run logs in again
+            await self.storage.write(delete_session_cookies, admission_number)
+            raise
+
+        await self.storage.write(
+            save_session_cookies,
+            admission_number=admission_number,
+            cookies=new_cookies,
+            expires_at=session_expiry(new_cookies),
+        )
+
+    async def _update_student(
+        self, admission_number: str, password: str, pages: Iterable[PageName]
+    ) -> None:
+        if self.process_pool is not None:
+            await self._update_student_in_worker(admission_number, password, pages)
+            return
+
+        # ingest each page while the driver is already fetching the next one
+        tasks: list[asyncio.Task[None]] = []
+        try:
+            async for page, page_source in self._iter_pages(
+                pages, admission_number, password
+            ):
+                tasks.append(
+                    asyncio.create_task(
+                        self._archive_and_ingest(
+                            page, page_source, admission_number, fetched_at()
+                        )
+                    )
+                )
+        finally:
+            # the pages fetched before a failing one are still ingested, the
+            # fetch error is raised once they are
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _archive_and_ingest(
+        self, page: PageName, page_source: str, admission_number: str, fetched: str
+    ) -> None:
+        # indexed before parsing, a page the parser fails on can be replayed
+        # once the parser is fixed
+        archived = {
+            "sha256": await asyncio.to_thread(self.page_archive.store, page_source),
+            "admission_number": admission_number,
+            "page_type": page,
+            "fetched_at": fetched,
+        }
+        await self.storage.write(insert_archived_page, class_=None, **archived)
+        class_ = await self._ingest(page, page_source, admission_number)
+        await self.storage.write(set_archived_page_class, class_=class_, **archived)
+
+    async def _ingest(
+        self, page: PageName, page_source: str, admission_number: str
+    ) -> str | None:
+        handlers = {
+            "profile": self._ingest_profile,
+            "timetable": functools.partial(
+                self._ingest_timetable, admission_number=admission_number
+            ),
+            "attendance": functools.partial(
+                self._ingest_attendance, admission_number=admission_number
+            ),
+        }
+        return await handlers[page](page_source)
+
+    async def _update_student_in_worker(
+        self, admission_number: str, password: str, pages: Iterable[PageName]
+    ) -> None:
+        assert self.process_pool is not None
+
+        cookies = await self.storage.read(get_session_cookies, admission_number)
+        log.info("sending %s pages of %s to a worker process", pages, admission_number)
+
+        loop = asyncio.get_running_loop()
+        try:
+            # the worker throttles its own requests, see ``init_worker``
+            async with self.scrape_executor.session():
+                result = await loop.run_in_executor(
+                    self.process_pool,
+                    scrape_student,
+                    admission_number,
+                    password,
+                    tuple(pages),
+                    cookies,
+                )
+        except Exception:
+            await self.storage.write(delete_session_cookies, admission_number)
+            raise
+
+        log.info(
+            "scraped %s: %s bytes, %.0f ms page load",
+            admission_number,
+            result["bytes_downloaded"],
+            result["page_load_time"],
+        )
+        await self.storage.write(
+            save_session_cookies,
+            admission_number=admission_number,
+            cookies=result["cookies"],
+            expires_at=result["expires_at"],
+        )
+
+        handlers = {
+            "profile": self._store_profile,
+            "timetable": functools.partial(
+                self._store_parsed_timetable, admission_number=admission_number
+            ),
+            "attendance": functools.partial(
+                self._store_attendance, admission_number=admission_number
             ),
-        ]
-
-        await asyncio.gather(*functions, return_exceptions=False)
-
-    async def _remove_old_timetable(self) -> None:
-        await self.cursor.execute(
-            """
-                DELETE FROM
-                    timetable
-                WHERE
-                    datetime(start_time) < datetime('now', '-7 days', '+5 hours', '+30 minutes');
-            """
-        )
-        await self.cursor.execute(
-            """
-                DELETE FROM 
-                    alternative_timetable
-                WHERE
-                    datetime(start_time) < datetime('now', '-7 days', '+5 hours', '+30 minutes');
-            """
-        )
-        log.info("committing changes")
-        await self.database_connection.commit()
+        }
+        for page, digest in result["archived"].items():
+            await self.storage.write(
+                insert_archived_page,
+                sha256=digest,
+                admission_number=admission_number,
+                class_=None,
+                page_type=page,
+                fetched_at=result["fetched_at"],
+            )
+        for page, data in result["pages"].items():
+            await self.storage.write(
+                set_archived_page_class,
+                sha256=result["archived"][page],
+                admission_number=admission_number,
+                class_=await handlers[page](data),
+                page_type=page,
+                fetched_at=result["fetched_at"],
+            )
+
+        if result["failed"]:
+            raise RuntimeError(
+                f"parsing {', '.join(result['failed'])} of {admission_number} "
+                f"failed in the worker:\n{''.join(result['failed'].values())}"
+            )
+
+    async def _replay_archive(
+        self,
+        pages: Iterable[PageName],
+        *,
+        class_: str | None = None,
+        since: str | None = None,
+    ) -> int:
+        archived = await self.storage.read(
+            get_archived_pages, page_types=pages, class_=class_, since=since
+        )
+        log.info("replaying %s archived pages", len(archived))
+        # the stored hashes describe what was ingested by the old parser
+        await self.storage.write(delete_timetable_hashes, class_=class_)
+
+        replayed = 0
+        for digest, page, admission_number in archived:
+            try:
+                page_source = await asyncio.to_thread(self.page_archive.load, digest)
+            except KeyError:
+                log.warning("archived %s page %s is missing, skipping", page, digest)
+                continue
+
+            await self._ingest(page, page_source, admission_number)  # type: ignore
+            replayed += 1
+
+        return replayed
+
+    async def _ingest_profile(self, page_source: str) -> str:
+        return await self._store_profile(ProfileParser(page_source).get_data())
+
+    async def _store_profile(self, data: ProfileType) -> str:
+        await self.storage.write(execute_query, ProfileParser.data_to_sql_query(data))
+        await self.storage.read(
+            self.timetable_index.load_student, data["admission_number"]
+        )
+        return data["class"]
+
+    async def _changed_timetable_tables(
+        self, hashes: TimeTableHashes, section: int | None
+    ) -> tuple[bool, bool]:
+        if section is None:
+            return True, True
+
+        stored = await self.storage.read(
+            get_timetable_hashes,
+            class_=hashes["class"],
+            section=section,
+            week=hashes["week"],
+        )
+        if stored is None:
+            return True, True
+
+        # the main table holds the class and the week both parts depend on
+        header = stored["main_hash"] != hashes["main_hash"]
+        return (
+            header or stored["details_hash"] != hashes["details_hash"],
+            header or stored["alternative_hash"] != hashes["alternative_hash"],
+        )
+
+    async def _ingest_timetable(
+        self, page_source: str, *, admission_number: str
+    ) -> str:
+        parser = TimeTableParser(page_source)
+        return await self._store_changed_timetable(
+            parser.get_table_hashes(),
+            parser.get_timetable,
+            parser.get_alternative_timetable,
+            admission_number=admission_number,
+        )
+
+    async def _store_parsed_timetable(
+        self,
+        parsed: tuple[TimeTableHashes, TimeTableGetData],
+        *,
+        admission_number: str,
+    ) -> str:
+        hashes, data = parsed
+        return await self._store_changed_timetable(
+            hashes,
+            lambda: data["timetable"],
+            lambda: data["alternative_timetable"],
+            admission_number=admission_number,
+        )
+
+    async def _store_changed_timetable(
+        self,
+        hashes: TimeTableHashes,
+        get_timetable: Callable[[], Arrangement],
+        get_alternative_timetable: Callable[[], AlternativeArrangement],
+        *,
+        admission_number: str,
+    ) -> str:
+        # every section of a class has its own timetable page, the hashes are
+        # kept per section. Without credentials the page is stored unchecked.
+        section = await self.storage.read(get_credential_section, admission_number)
+        main, alternative = await self._changed_timetable_tables(hashes, section)
+        if not (main or alternative):
+            log.info(
+                "timetable of %s section %s for week %s is unchanged, skipping",
+                hashes["class"],
+                section,
+                hashes["week"],
+            )
+            return hashes["class"]
+
+        # only parse the tables that changed
+        await self._store_timetable(
+            {
+                "timetable": get_timetable() if main else {},  # type: ignore
+                "alternative_timetable": (
+                    get_alternative_timetable() if alternative else {}
+                ),
+            }
+        )
+        if section is not None:
+            await self.storage.write(save_timetable_hashes, section=section, **hashes)
+        return hashes["class"]
+
+    async def _store_timetable(self, data: TimeTableGetData) -> str | None:
+        written = await self.storage.write(
+            insert_timetable, slot_cache=self.slot_cache, **data
+        )
+        # only cache ids that are committed
+        self.slot_cache.update(*written)
+        # re-index the classes from the committed rows, that also applies
+        # their alternative arrangements again
+        for class_ in {
+            row["class"]
+            for table in (data["timetable"], data["alternative_timetable"])
+            for rows in table.values()
+            for row in rows
+        }:
+            await self.storage.read(self.timetable_index.load_class, class_)
+        return next(
+            (row["class"] for rows in data["timetable"].values() for row in rows),
+            None,
+        )
+
+    async def _ingest_attendance(
+        self, page_source: str, *, admission_number: str
+    ) -> str:
+        return await self._store_attendance(
+            AttendanceParser(page_source).get_data(), admission_number=admission_number
+        )
+
+    async def _store_attendance(
+        self, data: AttendanceGetData, *, admission_number: str
+    ) -> str:
+        await self.storage.write(insert_attendance, {admission_number: data})
+        return data["class"]
+
+    async def _remove_expired_timetable(self) -> RetentionReport:
+        # deletes run in chunks so every write (and the lock it holds) stays
+        # short, the refresh loop keeps writing in between
+        started = time.perf_counter()
+        before = int(time.time()) - RETENTION_PERIOD
+        removed = dict.fromkeys(RETENTION_TABLES, 0)
+        archived = 0
+
+        for table in RETENTION_TABLES:
+            while True:
+                if self.expired_archive is None:
+                    deleted = await self.storage.write(
+                        delete_expired_rows,
+                        table=table,
+                        before=before,
+                        limit=RETENTION_CHUNK,
+                    )
+                else:
+                    # archived before they are deleted: a crash in between
+                    # archives a chunk twice instead of losing it
+                    rows = await self.storage.read(
+                        get_expired_rows,
+                        table=table,
+                        before=before,
+                        limit=RETENTION_CHUNK,
+                    )
+                    if not rows:
+                        break
+                    archived += await asyncio.to_thread(
+                        self.expired_archive.append, table, rows
+                    )
+                    deleted = await self.storage.write(
+                        delete_rows, table=table, ids=[row["id"] for row in rows]
+                    )
+
+                removed[table] += deleted
+                if deleted < RETENTION_CHUNK:
+                    break
+
+        removed["timetable_hashes"] = await self.storage.write(
+            delete_expired_timetable_hashes, before=before
+        )
+        self.timetable_index.prune(before)
+
+        report: RetentionReport = {
+            "before": before,
+            "removed": removed,
+            "archived": archived,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        log.info(
+            "retention removed %s rows (%s archived) in %.2f s",
+            removed,
+            archived,
+            report["seconds"],
+        )
+        return report
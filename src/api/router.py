@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import multiprocessing
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
 
-import aiosqlite
 from fastapi import APIRouter
 
+from src.web_driver.config import SCRAPE_BACKEND
+from src.web_driver.executor import ScrapeExecutor
+from src.web_driver.pool import DriverPool
+from src.worker import init_worker
+from utils.archive import ExpiredRowsArchive, PageArchive
+from utils.database import SlotCache
+from utils.migrations import migrate
+from utils.storage import Storage
+from utils.timetable_index import TimetableIndex
+
 from .api_paths import APIPaths
 
 DATABASE_PATH = pathlib.Path(__file__).parent.parent.parent / "cached.sqlite"
@@ -14,10 +25,23 @@ query = DATEBASE_INIT_QUERY.read_text()
 
 
 class Router(APIPaths):
-    def __init__(self, name: str | None = None) -> None:
+    def __init__(
+        self,
+        name: str | None = None,
+        *,
+        processes: int | None = None,
+        archive_expired: bool = False,
+    ) -> None:
         self.name = name
         self.router = APIRouter()
         self.INIT = False
+        # with ``processes`` set, login, download and parsing of every scrape
+        # run in that many worker processes instead of this one.
+        self.processes = processes
+        # the archive of expired rows is never pruned, it is off unless asked for
+        self.archive_expired = archive_expired
+        self.process_pool = None
+        self.retention_report = None
         self.add_all_routes()
 
     def __repr__(self) -> str:
@@ -27,22 +51,55 @@ class Router(APIPaths):
         if self.INIT:
             return
 
-        self.database_connection = await aiosqlite.connect(DATABASE_PATH)
-        self.cursor = await self.database_connection.cursor()
+        await self.init_database()
+
+        # with worker processes every scrape session runs in one of them
+        self.scrape_executor = (
+            ScrapeExecutor(max_sessions=self.processes)
+            if self.processes
+            else ScrapeExecutor()
+        )
+        self.driver_pool = DriverPool(executor=self.scrape_executor)
+        if self.processes:
+            self.process_pool = ProcessPoolExecutor(
+                self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                # the workers split the request budget of the portal
+                initargs=(self.scrape_executor.requests_per_second / self.processes,),
+            )
+        elif SCRAPE_BACKEND == "selenium":
+            await self.driver_pool.start()
 
-        await self.cursor.executescript(query)
         await self.start_loops()
         self.INIT = True
 
+    async def init_database(self) -> None:
+        self.storage = Storage(DATABASE_PATH)
+        await self.storage.open(
+            lambda connection: connection.executescript(query), migrate
+        )
+
+        self.page_archive = PageArchive()
+        self.expired_archive = ExpiredRowsArchive() if self.archive_expired else None
+        self.slot_cache = SlotCache()
+        await self.storage.read(self.slot_cache.load)
+        self.timetable_index = TimetableIndex()
+        await self.storage.read(self.timetable_index.load)
+
     async def start_loops(self) -> None:
         if self.INIT:
             raise RuntimeError("Server already initialized")
 
         self.global_timetable_update.start()
+        self.global_retention.start()
 
     async def close(self) -> None:
-        await self.cursor.close()
-        await self.database_connection.close()
+        await self.driver_pool.close()
+        self.scrape_executor.shutdown()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
+        await self.storage.close()
 
     def add_all_routes(self) -> None:
         if self.INIT:
@@ -51,6 +108,9 @@ class Router(APIPaths):
         self.add_meta_routes()
         self.add_credentials_routes()
         self.add_timetable_routes()
+        self.add_attendance_routes()
+        self.add_scrape_routes()
+        self.add_retention_routes()
 
     def add_meta_routes(self) -> None:
         self.router.add_api_route(
@@ -101,3 +161,51 @@ class Router(APIPaths):
             methods=["GET"],
             response_model=self._GET_timetable.__annotations__["return"],
         )
+        self.router.add_api_route(
+            "/timetable/batch",
+            self._POST_timetable_batch,
+            methods=["POST"],
+            response_model=None,
+        )
+        self.router.add_api_route(
+            "/timetable/week",
+            self._GET_timetable_week,
+            methods=["GET"],
+            response_model=None,
+        )
+        self.router.add_api_route(
+            "/timetable/day",
+            self._GET_timetable_day,
+            methods=["GET"],
+            response_model=None,
+        )
+        self.router.add_api_route(
+            "/timetable/stats",
+            self._GET_timetable_stats,
+            methods=["GET"],
+            response_model=self._GET_timetable_stats.__annotations__["return"],
+        )
+
+    def add_attendance_routes(self) -> None:
+        self.router.add_api_route(
+            "/attendance",
+            self._GET_attendance,
+            methods=["GET"],
+            response_model=self._GET_attendance.__annotations__["return"],
+        )
+
+    def add_scrape_routes(self) -> None:
+        self.router.add_api_route(
+            "/scrape/stats",
+            self._GET_scrape_stats,
+            methods=["GET"],
+            response_model=self._GET_scrape_stats.__annotations__["return"],
+        )
+
+    def add_retention_routes(self) -> None:
+        self.router.add_api_route(
+            "/retention/stats",
+            self._GET_retention_stats,
+            methods=["GET"],
+            response_model=self._GET_retention_stats.__annotations__["return"],
+        )
@@ -2,24 +2,34 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Final
 
+from utils.database import execute_query
 from utils.tasks import tasks
 
 from .meta import MetaClass
 
+if TYPE_CHECKING:
+    from src.web_driver.typehints import PageName
+
 log = logging.getLogger("__name__")
 
+# attendance is scraped at most once per this many seconds per student
+ATTENDANCE_INTERVAL: Final[int] = 24 * 60 * 60
+
 
 class TasksLoops(MetaClass):
     @tasks.loop(hours=3)
     async def global_timetable_update(self) -> None:
-        if not hasattr(self, "database_connection"):
+        if not hasattr(self, "storage"):
             return
 
-        seen = set()
         query = """
             SELECT 
-                SC.admission_number, SC.password, SC.section, S.semester, S.class
+                SC.admission_number, SC.password, SC.section, S.semester, S.class,
+                SC.attendance_refreshed_at
             FROM
                 students_credentials AS SC
             JOIN
@@ -27,16 +37,74 @@ class TasksLoops(MetaClass):
             ON
                 S.admission_number = SC.admission_number
         """
-        cur = await self.cursor.execute(query)
-        async for admission_number, password, section, semester, class_ in cur:
-            if (section, semester, class_) in seen:
-                continue
-            try:
-                await asyncio.gather(
-                    self._update_timetable(admission_number, password),
-                    self._remove_old_timetable(),
+        # fetched up front, the refresh takes long and must not hold a reader
+        students = await self.storage.read(execute_query, query)
+
+        # the timetable only has to be scraped once per section, attendance
+        # once a day per student. A student due for attendance comes first in
+        # its section so both share one login.
+        stale = int(time.time()) - ATTENDANCE_INTERVAL
+        students.sort(key=lambda student: (student[5] or 0) > stale)
+
+        seen: set[tuple] = set()
+        locks: defaultdict[tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+        logins = 0
+
+        async def refresh(
+            admission_number: str, password: str, key: tuple, due: bool
+        ) -> None:
+            nonlocal logins
+
+            pages: tuple[PageName, ...] = ("attendance",) if due else ()
+            async with locks[key]:
+                if key not in seen:
+                    logins += 1
+                    await self._update_student(
+                        admission_number, password, ("timetable", *pages)
+                    )
+                    seen.add(key)
+                    return
+
+            if pages:
+                logins += 1
+                await self._update_student(admission_number, password, pages)
+
+        # the scrape executor bounds how many of these run at once
+        results = await asyncio.gather(
+            *(
+                refresh(
+                    admission_number,
+                    password,
+                    (section, semester, class_),
+                    (refreshed_at or 0) <= stale,
                 )
-            except Exception:
-                pass
-            else:
-                seen.add((section, semester, class_))
+                for (
+                    admission_number,
+                    password,
+                    section,
+                    semester,
+                    class_,
+                    refreshed_at,
+                ) in students
+            ),
+            return_exceptions=True,
+        )
+        failed = sum(isinstance(result, Exception) for result in results)
+        log.info(
+            "refreshed %s sections with %s logins for %s students, %s failed",
+            len(seen),
+            logins,
+            len(students),
+            failed,
+        )
+
+    @tasks.loop(hours=6)
+    async def global_retention(self) -> None:
+        if not hasattr(self, "storage"):
+            return
+
+        # an unhandled error would stop the loop, the next run tries again
+        try:
+            self.retention_report = await self._remove_expired_timetable()
+        except Exception:
+            log.exception("retention failed")
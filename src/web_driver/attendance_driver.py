@@ -1,22 +1,22 @@
 from __future__ import annotations
 
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
 
+from .config import PAGES
 from .driver import WebDriver
 
 
 class AttendanceDriver(WebDriver):
+    page = "attendance"
+
     def click_button(self) -> None:
         self._click_profile()
 
     def _click_profile(self):
         self.wait_for_preloader()
-        href = "attendance/subwise_attendace_new.php"
+        href = PAGES["attendance"]
 
-        wait = WebDriverWait(self.driver, 10)
-        wait.until(EC.element_to_be_clickable((By.XPATH, f"//a[@href='{href}']")))
+        self.wait_for_clickable(f"a[href='{href}']")
         element = self.driver.find_element(By.XPATH, f"//a[@href='{href}']")
 
         element.click()
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import json
+import pathlib
+from typing import TYPE_CHECKING, Final
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from .typehints import PageName, SeleniumConfig
+
+config_path = pathlib.Path(__file__).parent / "config.json"
+
+with open(config_path, "r") as config_file:
+    config: SeleniumConfig = json.load(config_file)
+
+GU_ICLOUD_EMS_LOGIN: Final = config["login_page_endpoint"]
+GU_ICLOUD_EMS_HOST: Final = urlsplit(GU_ICLOUD_EMS_LOGIN).netloc
+SCRAPE_BACKEND: Final = config["scrape_backend"]
+PAGES: Final[dict[PageName, str]] = config["pages"]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Final
+
+from .config import config
+
+if TYPE_CHECKING:
+    from .typehints import Cookie
+
+SESSION_TTL: Final = config["session_ttl"]
+
+
+def session_expiry(cookies: list[Cookie], *, ttl: int = SESSION_TTL) -> int:
+    # the portal uses session cookies without an expiry, so the server side
+    # session lifetime (``session_ttl``) is the upper bound. It is an estimate
+    # only, a stored session is always tried before logging in again.
+    expires_at = int(time.time()) + ttl
+    return min(
+        [expires_at, *(cookie["expiry"] for cookie in cookies if "expiry" in cookie)]
+    )
@@ -1,70 +1,186 @@
 from __future__ import annotations
 
-import json
 import logging
 import pathlib
-from typing import TYPE_CHECKING, Final
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, ClassVar, Final, Iterator, Literal
+from urllib.parse import quote, urljoin
 
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.webdriver import WebDriver as FireFoxWebDriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
 
 if TYPE_CHECKING:
     from selenium.webdriver.remote.webelement import WebElement
 
-    from .typehints import SeleniumConfig
+    from .typehints import Cookie, NavigationStats, PageName, ScrapeProfileConfig
 
-config_path = pathlib.Path(__file__).parent / "config.json"
-
-with open(config_path, "r") as config_file:
-    config: SeleniumConfig = json.load(config_file)
+from .config import GU_ICLOUD_EMS_LOGIN, PAGES, config
 
 js_path = pathlib.Path(__file__).parent / config["external_javascript"]
 js = js_path.read_text(encoding="utf-8", errors="strict")
 
+wait_for_js_path = pathlib.Path(__file__).parent / "waitFor.js"
+wait_for_js = wait_for_js_path.read_text(encoding="utf-8", errors="strict")
+
+navigation_stats_js_path = pathlib.Path(__file__).parent / "navigationStats.js"
+navigation_stats_js = navigation_stats_js_path.read_text(
+    encoding="utf-8", errors="strict"
+)
+
 
 SELENIUM_ARGS: Final = config["selenium_args"]
-GU_ICLOUD_EMS_LOGIN: Final = config["login_page_endpoint"]
+SCRAPE_PROFILE: Final = config["scrape_profile"]
+
+# hosts in ``blocked_hosts`` are sent to a proxy that refuses every
+# connection, so the requests fail immediately instead of timing out.
+BLACKHOLE_PROXY: Final = "PROXY 127.0.0.1:9"
+
+# what has to be on a report page before its HTML is worth reading
+READY_SELECTORS: Final[dict[PageName, tuple[str, int]]] = {
+    "profile": (".profile-info-row", 1),
+    "timetable": ("table", 3),
+    "attendance": ("table", 1),
+}
 
 logger = logging.getLogger(__name__)
 
 
-class WebDriver:
-    def __init__(self, admission_number: str, password: str) -> None:
-        options = Options()
-        for arg in SELENIUM_ARGS:
-            options.add_argument(arg)
+def _blocked_hosts_pac(hosts: list[str]) -> str:
+    checks = " || ".join(f"dnsDomainIs(host, {host!r})" for host in hosts)
+    pac = (
+        "function FindProxyForURL(url, host) {"
+        f" return ({checks}) ? {BLACKHOLE_PROXY!r} : 'DIRECT'; "
+        "}"
+    )
+    return f"data:application/x-ns-proxy-autoconfig,{quote(pac)}"
+
+
+def _apply_scrape_profile(options: Options, profile: ScrapeProfileConfig) -> None:
+    # the scraped pages are only useful for their tables, so everything that
+    # is only needed to render them is switched off.
+    if profile["block_images"]:
+        options.set_preference("permissions.default.image", 2)
+    if profile["block_fonts"]:
+        options.set_preference("browser.display.use_document_fonts", 0)
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+    if profile["block_stylesheets"]:
+        options.set_preference("permissions.default.stylesheet", 2)
+    if profile["block_media"]:
+        options.set_preference("media.autoplay.default", 5)
+        options.set_preference("media.preload.default", 0)
+        options.set_preference("media.autoplay.blocking_policy", 2)
+    if profile["blocked_hosts"]:
+        options.set_preference("network.proxy.type", 2)
+        options.set_preference(
+            "network.proxy.autoconfig_url", _blocked_hosts_pac(profile["blocked_hosts"])
+        )
+
+    width, height = profile["window_size"]
+    options.add_argument(f"--width={width}")
+    options.add_argument(f"--height={height}")
+
+
+def create_firefox() -> FireFoxWebDriver:
+    options = Options()
+    for arg in SELENIUM_ARGS:
+        options.add_argument(arg)
 
+    if SCRAPE_PROFILE["enabled"]:
+        _apply_scrape_profile(options, SCRAPE_PROFILE)
+
+    driver = webdriver.Firefox(options=options)
+    if SCRAPE_PROFILE["enabled"]:
+        driver.set_window_size(*SCRAPE_PROFILE["window_size"])
+    else:
+        driver.maximize_window()
+
+    logger.info("started firefox session %s", driver.session_id)
+    return driver
+
+
+class WebDriver:
+    page: ClassVar[PageName | None] = None
+
+    def __init__(
+        self,
+        admission_number: str,
+        password: str,
+        *,
+        driver: FireFoxWebDriver | None = None,
+    ) -> None:
         self.__admission_number = admission_number
         self.__password = password
 
-        self.driver = webdriver.Firefox(options=options)
-        self.driver.maximize_window()
-        self.driver.implicitly_wait(3)
+        # when a driver is handed in (e.g. by ``DriverPool``) the caller owns
+        # the browser process and ``close`` must leave it running.
+        self._owns_driver = driver is None
+        self.driver = create_firefox() if driver is None else driver
 
         self.__login_success = False
+        self.navigations: list[NavigationStats] = []
+        self.timings: dict[str, float] = {}
 
         logger.info("initialized web driver")
 
-    def _wait_for(self, cls_name: str, *, timeout: int = 10):
-        logger.debug("Waiting for element with class name: %s", cls_name)
+    @contextmanager
+    def _timed(self, step: str) -> Iterator[None]:
+        started = time.perf_counter()
         try:
-            element = self.driver.find_element(By.CLASS_NAME, cls_name)
-        except NoSuchElementException:
-            return
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[step] = self.timings.get(step, 0) + elapsed
+
+    def _record_navigation(self) -> NavigationStats:
+        stats: NavigationStats = self.driver.execute_script(navigation_stats_js)
+        self.navigations.append(stats)
+        logger.info(
+            "Loaded %s: %s bytes in %s ms from %s requests",
+            stats["url"],
+            stats["bytes"],
+            stats["load_time"],
+            stats["resources"] + 1,
+        )
+        return stats
+
+    @property
+    def bytes_downloaded(self) -> int:
+        return sum(stats["bytes"] for stats in self.navigations)
+
+    @property
+    def page_load_time(self) -> float:
+        return sum(stats["load_time"] or 0 for stats in self.navigations)
+
+    def _wait_until(
+        self,
+        selector: str,
+        condition: Literal["present", "hidden", "enabled"] = "present",
+        *,
+        count: int = 1,
+        timeout: int = 10,
+    ) -> None:
+        logger.debug("Waiting for %s to be %s", selector, condition)
+        if not self.driver.execute_async_script(
+            wait_for_js, selector, condition, count, timeout * 1000
+        ):
+            raise TimeoutException(f"{selector} was not {condition} after {timeout}s")
 
-        wait = WebDriverWait(self.driver, timeout)
+    def _wait_for(self, cls_name: str, *, timeout: int = 10):
+        logger.debug("Waiting for element with class name: %s", cls_name)
+        self._wait_until("." + ".".join(cls_name.split()), "hidden", timeout=timeout)
 
-        def is_display_none(_) -> bool:
-            maybe_none = element.value_of_css_property("display")
-            return maybe_none == "none"
+    def wait_for_clickable(self, selector: str, *, timeout: int = 10) -> None:
+        self._wait_until(selector, "enabled", timeout=timeout)
 
-        wait.until(is_display_none)
+    def wait_for_page(self, page: PageName, *, timeout: int = 20) -> None:
+        selector, count = READY_SELECTORS[page]
+        self.wait_for_preloader()
+        self._wait_until(selector, count=count, timeout=timeout)
 
     def wait_for_preloader(self) -> None:
         self.__wait_for("Waiting for preloader to disappear", "preloader-backdrop")
@@ -81,37 +197,77 @@ class WebDriver:
 
     def login(self) -> FireFoxWebDriver:
         logger.info("Logging in with admission number: %s", self.__admission_number)
-
-        logger.debug("Getting login page %s", GU_ICLOUD_EMS_LOGIN)
-        self.driver.get(GU_ICLOUD_EMS_LOGIN)
-
-        self._input_and_click(
-            self.driver.find_element(By.ID, config["input_username_id"]),
+        self.timings = {}
+
+        with self._timed("page_load"):
+            logger.debug("Getting login page %s", GU_ICLOUD_EMS_LOGIN)
+            self.driver.get(GU_ICLOUD_EMS_LOGIN)
+            self._record_navigation()
+
+        with self._timed("credential_entry"):
+            self._input_and_click(
+                self.driver.find_element(By.ID, config["input_username_id"]),
+                self.__admission_number,
+            )
+
+            self._input_and_click(
+                self.driver.find_element(By.ID, config["input_password_id"]),
+                self.__password,
+            )
+
+        with self._timed("verify_branch"):
+            self.driver.execute_script(
+                f"""verify_branch({self.__admission_number!r})"""
+            )
+            self.wait_for_clickable(f"#{config['login_button_id']}")
+
+        with self._timed("preloader"):
+            self.wait_for_preloader()
+
+        with self._timed("navigation"):
+            submit = self.driver.find_element(By.ID, config["login_button_id"])
+            submit.click()
+
+            self.click_button()
+            if self.page is not None:
+                self.wait_for_page(self.page)
+
+        with self._timed("script_injection"):
+            self.driver.execute_script(js)
+
+        self._record_navigation()
+        logger.info(
+            "Logged in %s in %.0f ms (%s)",
             self.__admission_number,
+            sum(self.timings.values()),
+            ", ".join(f"{step}={ms:.0f}ms" for step, ms in self.timings.items()),
         )
 
-        self._input_and_click(
-            self.driver.find_element(By.ID, config["input_password_id"]),
-            self.__password,
-        )
-
-        self.driver.execute_script(f"""verify_branch({self.__admission_number!r})""")
-
-        wait = WebDriverWait(self.driver, 10)
-        wait.until(EC.element_to_be_clickable((By.ID, config["login_button_id"])))
-
-        self.wait_for_preloader()
-
-        submit = self.driver.find_element(By.ID, config["login_button_id"])
-        submit.click()
-
-        self.click_button()
-        self.driver.execute_script(js)
+        self.__login_success = True
+        return self.driver
 
-        self._wait_for("ONE MORE STUPID WAIT", timeout=20)
+    def resume_session(self, cookies: list[Cookie], page: PageName) -> str | None:
+        logger.info("Resuming session of admission number: %s", self.__admission_number)
 
+        # cookies can only be set for the domain that is currently open
+        self.driver.get(GU_ICLOUD_EMS_LOGIN)
+        self._record_navigation()
+        for cookie in cookies:
+            self.driver.add_cookie(cookie)  # type: ignore
+
+        self.driver.get(urljoin(GU_ICLOUD_EMS_LOGIN, PAGES[page]))
+        if self.driver.find_elements(By.ID, config["input_username_id"]):
+            logger.info("Stored session has expired, logging in again")
+            self.driver.delete_all_cookies()
+            return None
+
+        self.wait_for_page(page)
+        self._record_navigation()
         self.__login_success = True
-        return self.driver
+        return self.driver.page_source
+
+    def get_cookies(self) -> list[Cookie]:
+        return self.driver.get_cookies()  # type: ignore
 
     def download_page_source(self) -> str:
         if not self.__login_success:
@@ -141,4 +297,5 @@ class WebDriver:
         raise NotImplementedError('You must implement "click_button" method.')
 
     def close(self) -> None:
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.quit()
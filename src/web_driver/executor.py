@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Final, TypeVar
+
+from .config import config
+
+if TYPE_CHECKING:
+    from .typehints import ExecutorStats
+
+try:
+    import psutil  # type: ignore
+
+    def available_memory() -> int | None:
+        return psutil.virtual_memory().available
+
+except ImportError:
+
+    def available_memory() -> int | None:
+        try:
+            with open("/proc/meminfo", "r") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+
+EXECUTOR_CONFIG: Final = config["executor"]
+MEMORY_CHECK_INTERVAL: Final = 1
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HostRateLimiter:
+    __slots__ = ("interval", "_next_slot", "_lock")
+
+    def __init__(self, requests_per_second: float) -> None:
+        self.interval = 1 / requests_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ScrapeExecutor:
+    def __init__(
+        self,
+        *,
+        max_sessions: int = EXECUTOR_CONFIG["max_sessions"],
+        max_threads: int = EXECUTOR_CONFIG["max_threads"],
+        min_free_memory_mb: int = EXECUTOR_CONFIG["min_free_memory_mb"],
+        requests_per_second: float = EXECUTOR_CONFIG["requests_per_second"],
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.min_free_memory = min_free_memory_mb * 1024 * 1024
+        self.requests_per_second = requests_per_second
+
+        self._threads = ThreadPoolExecutor(max_threads, thread_name_prefix="scrape")
+        self._sessions = asyncio.Semaphore(max_sessions)
+        self._hosts: dict[str, HostRateLimiter] = {}
+
+        self.queued = 0
+        self.in_flight = 0
+        self.running = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<ScrapeExecutor queued={self.queued} in_flight={self.in_flight} "
+            f"running={self.running}>"
+        )
+
+    async def _wait_for_memory(self) -> None:
+        while (memory := available_memory()) is not None and (
+            memory < self.min_free_memory
+        ):
+            logger.warning(
+                "only %s MB of memory available, holding back new scrapes",
+                memory // (1024 * 1024),
+            )
+            await asyncio.sleep(MEMORY_CHECK_INTERVAL)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[None]:
+        self.queued += 1
+        try:
+            await self._sessions.acquire()
+        finally:
+            self.queued -= 1
+
+        try:
+            await self._wait_for_memory()
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            self._sessions.release()
+
+    async def throttle(self, host: str) -> None:
+        if host not in self._hosts:
+            self._hosts[host] = HostRateLimiter(self.requests_per_second)
+        await self._hosts[host].wait()
+
+    async def run(
+        self, func: Callable[..., T], *args: Any, host: str | None = None
+    ) -> T:
+        if host is not None:
+            await self.throttle(host)
+
+        loop = asyncio.get_running_loop()
+        self.running += 1
+        try:
+            return await loop.run_in_executor(
+                self._threads, functools.partial(func, *args)
+            )
+        finally:
+            self.running -= 1
+
+    def stats(self) -> ExecutorStats:
+        memory = available_memory()
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "max_sessions": self.max_sessions,
+            "available_memory_mb": None if memory is None else memory // (1024 * 1024),
+        }
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
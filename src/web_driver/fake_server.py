@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import pathlib
+import secrets
+from typing import Final
+from urllib.parse import urljoin, urlsplit
+
+from aiohttp import web
+
+from .config import GU_ICLOUD_EMS_LOGIN, PAGES, config
+
+# A tiny stand-in for the ICloudEMS portal: the same login form, the same
+# ``verify_branch`` round trip and the report pages served from ``fixtures/``,
+# filled in with the admission number of the session.
+# Point ``login_page_endpoint`` (or ``HTTPDriver(login_page=...)``) at it to
+# run either backend offline.
+
+FIXTURES_PATH: Final = pathlib.Path(__file__).parent / "fixtures"
+SESSION_COOKIE: Final = "PHPSESSID"
+
+LOGIN_PATH: Final = urlsplit(GU_ICLOUD_EMS_LOGIN).path
+VERIFY_BRANCH_PATH: Final = urlsplit(
+    urljoin(GU_ICLOUD_EMS_LOGIN, config["verify_branch_endpoint"])
+).path
+
+USERNAME: Final = config["input_username_id"]
+PASSWORD: Final = config["input_password_id"]
+LOGIN_BUTTON: Final = config["login_button_id"]
+
+LOGIN_PAGE: Final = f"""<!DOCTYPE html>
+<html>
+<head><title>ICloudEMS</title></head>
+<body>
+    <div class="preloader-backdrop" style="display: none"></div>
+    <form method="post" action="{LOGIN_PATH}">
+        <input type="hidden" name="login_type" value="student">
+        <input type="text" id="{USERNAME}" name="{USERNAME}">
+        <input type="password" id="{PASSWORD}" name="{PASSWORD}">
+        <button type="submit" id="{LOGIN_BUTTON}" name="{LOGIN_BUTTON}" value="1" disabled>Login</button>
+    </form>
+    <script>
+        function verify_branch(userid) {{
+            const body = new URLSearchParams({{ {USERNAME}: userid }});
+            fetch("{VERIFY_BRANCH_PATH}", {{ method: "POST", body: body }})
+                .then(() => {{ document.getElementById("{LOGIN_BUTTON}").disabled = false; }});
+        }}
+    </script>
+</body>
+</html>
+"""
+
+DASHBOARD_PAGE: Final = """<!DOCTYPE html>
+<html>
+<head><title>Dashboard</title></head>
+<body>
+    <div class="preloader-backdrop" style="display: none"></div>
+    <img class="rounded-circle" src="data:," alt="profile">
+    <ul>
+        {links}
+    </ul>
+</body>
+</html>
+"""
+
+log = logging.getLogger(__name__)
+
+
+def _page_path(page: str) -> str:
+    return urlsplit(urljoin(GU_ICLOUD_EMS_LOGIN, PAGES[page])).path  # type: ignore
+
+
+async def _login_page(request: web.Request) -> web.Response:
+    return web.Response(text=LOGIN_PAGE, content_type="text/html")
+
+
+async def _verify_branch(request: web.Request) -> web.Response:
+    data = await request.post()
+    request.app["verified"].add(data.get(USERNAME))
+    return web.json_response({"status": "success"})
+
+
+async def _login(request: web.Request) -> web.Response:
+    data = await request.post()
+    admission_number = data.get(USERNAME)
+    password = data.get(PASSWORD)
+
+    accounts: dict[str, str] = request.app["accounts"]
+    if (
+        admission_number not in request.app["verified"]
+        or accounts.get(admission_number) != password  # type: ignore
+    ):
+        log.info("rejected login for %s", admission_number)
+        return web.Response(text=LOGIN_PAGE, content_type="text/html")
+
+    session_id = secrets.token_hex(16)
+    request.app["sessions"][session_id] = admission_number
+    links = "\n        ".join(
+        f'<li><a href="{href}">{page}</a></li>' for page, href in PAGES.items()
+    )
+    response = web.Response(
+        text=DASHBOARD_PAGE.format(links=links), content_type="text/html"
+    )
+    response.set_cookie(SESSION_COOKIE, session_id)
+    return response
+
+
+def _report_handler(page: str):
+    html = (FIXTURES_PATH / f"{page}.html").read_text(encoding="utf-8")
+
+    async def handler(request: web.Request) -> web.Response:
+        admission_number = request.app["sessions"].get(
+            request.cookies.get(SESSION_COOKIE)
+        )
+        if admission_number is None:
+            raise web.HTTPFound(LOGIN_PATH)
+        return web.Response(
+            text=html.format(admission_number=admission_number),
+            content_type="text/html",
+        )
+
+    return handler
+
+
+def create_app(accounts: dict[str, str]) -> web.Application:
+    app = web.Application()
+    app["accounts"] = accounts
+    app["verified"] = set()
+    app["sessions"] = {}
+
+    app.router.add_get(LOGIN_PATH, _login_page)
+    app.router.add_post(LOGIN_PATH, _login)
+    app.router.add_post(VERIFY_BRANCH_PATH, _verify_branch)
+    for page in PAGES:
+        app.router.add_get(_page_path(page), _report_handler(page))
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake ICloudEMS portal.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--account",
+        action="append",
+        default=[],
+        metavar="ADMISSION_NUMBER:PASSWORD",
+        help="account allowed to log in, can be given more than once",
+    )
+    args = parser.parse_args()
+
+    accounts = dict(account.split(":", 1) for account in args.account)
+    logging.basicConfig(level=logging.INFO)
+    log.info("login page: http://%s:%s%s", args.host, args.port, LOGIN_PATH)
+    web.run_app(create_app(accounts), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Final, Iterable
+from urllib.parse import urljoin
+
+import aiohttp
+from bs4 import BeautifulSoup
+from yarl import URL
+
+from .config import GU_ICLOUD_EMS_LOGIN, PAGES, config
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+    from .executor import ScrapeExecutor
+    from .typehints import Cookie, NavigationStats, PageName
+
+HTTP_TIMEOUT: Final = aiohttp.ClientTimeout(total=config["http_timeout"])
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPDriver:
+    page: PageName
+
+    def __init__(
+        self,
+        admission_number: str,
+        password: str,
+        *,
+        login_page: str = GU_ICLOUD_EMS_LOGIN,
+        executor: ScrapeExecutor | None = None,
+    ) -> None:
+        self.__admission_number = admission_number
+        self.__password = password
+
+        self.login_page = login_page
+        self.executor = executor
+        # every student gets a fresh cookie jar; ``unsafe`` lets it keep
+        # cookies for IP hosts such as the local fake portal.
+        self.session = aiohttp.ClientSession(
+            cookie_jar=aiohttp.CookieJar(unsafe=True), timeout=HTTP_TIMEOUT
+        )
+
+        self.__login_success = False
+        self.navigations: list[NavigationStats] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def _fetch(self, method: str, url: str, **kwargs: Any) -> tuple[str, str]:
+        if self.executor is not None:
+            await self.executor.throttle(URL(url).host or "")
+
+        started = time.perf_counter()
+        async with self.session.request(method, url, **kwargs) as response:
+            response.raise_for_status()
+            body = await response.read()
+            html = body.decode(response.get_encoding(), errors="replace")
+
+        stats: NavigationStats = {
+            "url": str(response.url),
+            "load_time": (time.perf_counter() - started) * 1000,
+            "bytes": len(body),
+            "resources": 0,
+        }
+        self.navigations.append(stats)
+        logger.info(
+            "Loaded %s: %s bytes in %.0f ms",
+            stats["url"],
+            stats["bytes"],
+            stats["load_time"],
+        )
+        return html, stats["url"]
+
+    @property
+    def bytes_downloaded(self) -> int:
+        return sum(stats["bytes"] for stats in self.navigations)
+
+    @property
+    def page_load_time(self) -> float:
+        return sum(stats["load_time"] or 0 for stats in self.navigations)
+
+    def _is_login_page(self, html: str) -> bool:
+        return f'id="{config["input_username_id"]}"' in html
+
+    def _parse_login_form(self, html: str, url: str) -> tuple[str, dict[str, str]]:
+        soup = BeautifulSoup(html, "html.parser")
+        username = soup.find("input", id=config["input_username_id"])
+        password = soup.find("input", id=config["input_password_id"])
+        if username is None or password is None:
+            raise RuntimeError("Could not find the login form.")
+
+        form = username.find_parent("form")
+        if form is None:
+            raise RuntimeError("Could not find the login form.")
+
+        fields: dict[str, str] = {}
+        for element in form.find_all(["input", "button"]):
+            name = element.get("name")
+            if not name or element.get("type") in {"submit", "button"}:
+                continue
+            fields[name] = element.get("value", "")  # type: ignore
+
+        # the browser only submits the button that was clicked
+        button = form.find(id=config["login_button_id"])
+        if button is not None and button.get("name"):
+            fields[button["name"]] = button.get("value", "")  # type: ignore
+
+        username_field: str = username.get("name") or config["input_username_id"]  # type: ignore
+        password_field: str = password.get("name") or config["input_password_id"]  # type: ignore
+        fields[username_field] = self.__admission_number
+        fields[password_field] = self.__password
+
+        return urljoin(url, form.get("action") or url), fields  # type: ignore
+
+    async def _verify_branch(self) -> None:
+        url = urljoin(self.login_page, config["verify_branch_endpoint"])
+        logger.debug("Verifying branch with %s", url)
+        await self._fetch(
+            "POST", url, data={config["input_username_id"]: self.__admission_number}
+        )
+
+    async def login(self) -> None:
+        logger.info("Logging in with admission number: %s", self.__admission_number)
+
+        logger.debug("Getting login page %s", self.login_page)
+        html, url = await self._fetch("GET", self.login_page)
+        action, fields = self._parse_login_form(html, url)
+
+        await self._verify_branch()
+
+        logger.debug("Submitting login form to %s", action)
+        html, _ = await self._fetch("POST", action, data=fields)
+
+        if self._is_login_page(html):
+            raise RuntimeError(
+                f"Login failed for admission number {self.__admission_number}."
+            )
+
+        self.__login_success = True
+
+    async def _get_page(self, page: PageName) -> str:
+        url = urljoin(self.login_page, PAGES[page])
+        logger.debug("Getting page %s", url)
+        html, _ = await self._fetch("GET", url)
+        return html
+
+    async def resume_session(
+        self, cookies: list[Cookie], page: PageName | None = None
+    ) -> str | None:
+        logger.info("Resuming session of admission number: %s", self.__admission_number)
+        for cookie in cookies:
+            self.session.cookie_jar.update_cookies(
+                {cookie["name"]: cookie["value"]}, response_url=URL(self.login_page)
+            )
+
+        html = await self._get_page(page or self.page)
+        if self._is_login_page(html):
+            logger.info("Stored session has expired, logging in again")
+            self.session.cookie_jar.clear()
+            return None
+
+        self.__login_success = True
+        return html
+
+    def get_cookies(self) -> list[Cookie]:
+        return [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "path": morsel["path"] or "/",
+            }
+            for morsel in self.session.cookie_jar
+        ]
+
+    async def download_page_source(self, page: PageName | None = None) -> str:
+        if not self.__login_success:
+            raise RuntimeError("You must login first.")
+
+        html = await self._get_page(page or self.page)
+        if self._is_login_page(html):
+            raise RuntimeError("Session expired before the page could be downloaded.")
+
+        return html
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+class HTTPProfileDriver(HTTPDriver):
+    page = "profile"
+
+
+class HTTPTimeTableDriver(HTTPDriver):
+    page = "timetable"
+
+
+class HTTPAttendanceDriver(HTTPDriver):
+    page = "attendance"
+
+
+class HTTPMultiPageDriver(HTTPDriver):
+    def __init__(
+        self,
+        admission_number: str,
+        password: str,
+        *,
+        pages: Iterable[PageName],
+        login_page: str = GU_ICLOUD_EMS_LOGIN,
+        executor: ScrapeExecutor | None = None,
+    ) -> None:
+        super().__init__(
+            admission_number, password, login_page=login_page, executor=executor
+        )
+        self.pages: tuple[PageName, ...] = tuple(pages)
+
+    async def download_pages(
+        self, cookies: list[Cookie] | None = None
+    ) -> dict[PageName, str]:
+        return {page: html async for page, html in self.iter_pages(cookies)}
+
+    async def iter_pages(
+        self, cookies: list[Cookie] | None = None
+    ) -> AsyncIterator[tuple[PageName, str]]:
+        pages = list(self.pages)
+        if cookies and (page_source := await self.resume_session(cookies, pages[0])):
+            yield pages.pop(0), page_source
+        else:
+            await self.login()
+
+        for page in pages:
+            yield page, await self.download_page_source(page)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, Iterable
+from urllib.parse import urljoin
+
+from .config import GU_ICLOUD_EMS_HOST, GU_ICLOUD_EMS_LOGIN, PAGES
+from .driver import WebDriver
+
+if TYPE_CHECKING:
+    from selenium.webdriver.firefox.webdriver import WebDriver as FireFoxWebDriver
+
+    from .executor import ScrapeExecutor
+    from .typehints import Cookie, PageName
+
+logger = logging.getLogger(__name__)
+
+
+class MultiPageDriver(WebDriver):
+    def __init__(
+        self,
+        admission_number: str,
+        password: str,
+        *,
+        pages: Iterable[PageName],
+        driver: FireFoxWebDriver | None = None,
+    ) -> None:
+        super().__init__(admission_number, password, driver=driver)
+        self.pages: tuple[PageName, ...] = tuple(pages)
+
+    def click_button(self) -> None:
+        # stay on the dashboard, every page is opened by ``visit``
+        self.wait_for_preloader()
+
+    def visit(self, page: PageName) -> str:
+        # the session cookie is all the portal checks, so the report pages can
+        # be opened directly instead of clicking through the menus again.
+        url = urljoin(GU_ICLOUD_EMS_LOGIN, PAGES[page])
+        logger.info("Visiting %s page %s", page, url)
+        self.driver.get(url)
+        self.wait_for_page(page)
+        self._record_navigation()
+        return self.download_page_source()
+
+    def download_pages(
+        self, cookies: list[Cookie] | None = None
+    ) -> dict[PageName, str]:
+        pages = list(self.pages)
+        result: dict[PageName, str] = {}
+        if cookies and (page_source := self.resume_session(cookies, pages[0])):
+            result[pages.pop(0)] = page_source
+        else:
+            self.login()
+
+        result.update((page, self.visit(page)) for page in pages)
+        return result
+
+    async def iter_pages(
+        self,
+        cookies: list[Cookie] | None = None,
+        *,
+        executor: ScrapeExecutor | None = None,
+    ) -> AsyncIterator[tuple[PageName, str]]:
+        # every step below is at least one request to the portal
+        run = (
+            asyncio.to_thread
+            if executor is None
+            else functools.partial(executor.run, host=GU_ICLOUD_EMS_HOST)
+        )
+
+        pages = list(self.pages)
+        if cookies and (
+            page_source := await run(self.resume_session, cookies, pages[0])
+        ):
+            yield pages.pop(0), page_source
+        else:
+            await run(self.login)
+
+        for page in pages:
+            yield page, await run(self.visit, page)
@@ -0,0 +1,15 @@
+const navigation = performance.getEntriesByType("navigation")[0];
+const resources = performance.getEntriesByType("resource");
+
+let loadTime = null;
+if (navigation) {
+    const end = navigation.loadEventEnd || navigation.domContentLoadedEventEnd || navigation.responseEnd;
+    loadTime = end - navigation.startTime;
+}
+
+return {
+    url: window.location.href,
+    load_time: loadTime,
+    bytes: (navigation ? navigation.transferSize : 0) + resources.reduce((total, entry) => total + entry.transferSize, 0),
+    resources: resources.length,
+};
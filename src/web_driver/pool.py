@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Final, TypeVar
+
+from selenium.common.exceptions import WebDriverException
+
+from .config import config
+from .driver import WebDriver, create_firefox
+
+if TYPE_CHECKING:
+    from selenium.webdriver.firefox.webdriver import WebDriver as FireFoxWebDriver
+
+    from .executor import ScrapeExecutor
+
+POOL_SIZE: Final = config["pool_size"]
+POOL_MAX_USES: Final = config["pool_max_uses"]
+
+RESET_STORAGE_SCRIPT: Final = """
+    try { window.localStorage.clear(); } catch (e) {}
+    try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+logger = logging.getLogger(__name__)
+
+WD = TypeVar("WD", bound=WebDriver)
+
+
+def reset_browser(driver: FireFoxWebDriver) -> None:
+    # cookies and storage are scoped to the current origin, so they have to
+    # be cleared before leaving the portal page.
+    driver.delete_all_cookies()
+    driver.execute_script(RESET_STORAGE_SCRIPT)
+    driver.get("about:blank")
+
+
+class PooledSession:
+    __slots__ = ("driver", "uses", "broken")
+
+    def __init__(self, driver: FireFoxWebDriver) -> None:
+        self.driver = driver
+        self.uses = 0
+        self.broken = False
+
+    def __repr__(self) -> str:
+        return f"<PooledSession session_id={self.driver.session_id!r} uses={self.uses}>"
+
+
+class DriverPool:
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        *,
+        max_uses: int = POOL_MAX_USES,
+        executor: ScrapeExecutor | None = None,
+    ) -> None:
+        if size <= 0:
+            raise ValueError("size must be greater than 0")
+        if max_uses <= 0:
+            raise ValueError("max_uses must be greater than 0")
+
+        self.size = size
+        self.max_uses = max_uses
+        # starting, resetting and quitting a browser all block
+        self._run = asyncio.to_thread if executor is None else executor.run
+
+        self._idle: asyncio.Queue[PooledSession] = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(size)
+        self._live = 0
+        self._closed = False
+        self._background: set[asyncio.Task[None]] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f"<DriverPool size={self.size} live={self._live} idle={self._idle.qsize()}>"
+        )
+
+    async def start(self) -> None:
+        logger.info("warming up %s firefox sessions", self.size)
+        results = await asyncio.gather(
+            *(self._spawn() for _ in range(self.size - self._live)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                # the pool will try again on demand in ``acquire``
+                logger.error("could not warm up firefox session", exc_info=result)
+            else:
+                self._idle.put_nowait(result)
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in self._background:
+            task.cancel()
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        driver_cls: type[WD],
+        admission_number: str,
+        password: str,
+        **kwargs: Any,
+    ) -> AsyncIterator[WD]:
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+
+        async with self._semaphore:
+            session = await self._checkout()
+            try:
+                yield driver_cls(
+                    admission_number, password, driver=session.driver, **kwargs
+                )
+            except WebDriverException:
+                logger.warning("session %r crashed, recycling it", session)
+                session.broken = True
+                raise
+            finally:
+                session.uses += 1
+                await self._checkin(session)
+
+    async def _spawn(self) -> PooledSession:
+        driver = await self._run(create_firefox)
+        self._live += 1
+        return PooledSession(driver)
+
+    async def _discard(self, session: PooledSession) -> None:
+        self._live -= 1
+        try:
+            await self._run(session.driver.quit)
+        except WebDriverException:
+            logger.debug("session %r was already gone", session)
+
+    async def _checkout(self) -> PooledSession:
+        while not self._idle.empty():
+            session = self._idle.get_nowait()
+            if await self._run(self._is_alive, session):
+                return session
+            await self._discard(session)
+
+        return await self._spawn()
+
+    async def _checkin(self, session: PooledSession) -> None:
+        if self._closed or session.broken or session.uses >= self.max_uses:
+            logger.info("retiring session %r", session)
+            await self._discard(session)
+            self._replenish()
+            return
+
+        try:
+            await self._run(reset_browser, session.driver)
+        except WebDriverException:
+            logger.warning("could not reset session %r, recycling it", session)
+            await self._discard(session)
+            self._replenish()
+        else:
+            self._idle.put_nowait(session)
+
+    def _replenish(self) -> None:
+        if self._closed:
+            return
+
+        async def replace() -> None:
+            try:
+                session = await self._spawn()
+            except WebDriverException:
+                logger.exception("could not replace retired firefox session")
+                return
+
+            if self._live > self.size:
+                # ``_checkout`` already spawned one on demand in the meantime
+                await self._discard(session)
+            else:
+                self._idle.put_nowait(session)
+
+        task = asyncio.create_task(replace())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    def _is_alive(session: PooledSession) -> bool:
+        try:
+            session.driver.current_url
+        except WebDriverException:
+            return False
+        return True
@@ -1,6 +1,26 @@
 from __future__ import annotations
 
-from typing import TypedDict
+from typing import Any, Literal, NotRequired, TypedDict
+
+PageName = Literal["profile", "timetable", "attendance"]
+ScrapeBackend = Literal["selenium", "http"]
+
+
+class ScrapeProfileConfig(TypedDict):
+    enabled: bool
+    window_size: tuple[int, int]
+    block_images: bool
+    block_fonts: bool
+    block_stylesheets: bool
+    block_media: bool
+    blocked_hosts: list[str]
+
+
+class ExecutorConfig(TypedDict):
+    max_sessions: int
+    max_threads: int
+    min_free_memory_mb: int
+    requests_per_second: float
 
 
 class SeleniumConfig(TypedDict):
@@ -10,3 +30,49 @@ class SeleniumConfig(TypedDict):
     input_password_id: str
     login_button_id: str
     external_javascript: str
+    pool_size: int
+    pool_max_uses: int
+    scrape_backend: ScrapeBackend
+    pages: dict[PageName, str]
+    verify_branch_endpoint: str
+    http_timeout: float
+    session_ttl: int
+    scrape_profile: ScrapeProfileConfig
+    executor: ExecutorConfig
+
+
+class Cookie(TypedDict):
+    name: str
+    value: str
+    domain: NotRequired[str]
+    path: NotRequired[str]
+    expiry: NotRequired[int]
+    secure: NotRequired[bool]
+    httpOnly: NotRequired[bool]
+
+
+class NavigationStats(TypedDict):
+    url: str
+    load_time: float | None
+    bytes: int
+    resources: int
+
+
+class ExecutorStats(TypedDict):
+    queued: int
+    in_flight: int
+    running: int
+    max_sessions: int
+    available_memory_mb: int | None
+
+
+class ScrapeResult(TypedDict):
+    pages: dict[PageName, Any]
+    # formatted tracebacks of the pages that failed to parse
+    failed: dict[PageName, str]
+    cookies: list[Cookie]
+    expires_at: int
+    bytes_downloaded: int
+    page_load_time: float
+    archived: dict[PageName, str]
+    fetched_at: str
@@ -0,0 +1,44 @@
+// Resolves as soon as the DOM condition holds, instead of polling from Python.
+// Called through ``execute_async_script(selector, condition, count, timeout)``.
+const [selector, condition, count, timeout] = arguments;
+const done = arguments[arguments.length - 1];
+
+function isVisible(element) {
+    const style = window.getComputedStyle(element);
+    return style.display !== "none" && style.visibility !== "hidden";
+}
+
+function check() {
+    const elements = Array.from(document.querySelectorAll(selector));
+    switch (condition) {
+        case "hidden":
+            return elements.every((element) => !isVisible(element));
+        case "enabled":
+            return elements.some((element) => isVisible(element) && !element.disabled);
+        default:
+            return elements.length >= count;
+    }
+}
+
+if (check()) {
+    done(true);
+} else {
+    const observer = new MutationObserver(() => {
+        if (check()) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done(true);
+        }
+    });
+    observer.observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ["style", "class", "disabled"],
+    });
+
+    const timer = setTimeout(() => {
+        observer.disconnect();
+        done(check());
+    }, timeout);
+}
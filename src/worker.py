@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import traceback
+from typing import TYPE_CHECKING, Any, Callable, Final
+
+from selenium.common.exceptions import WebDriverException
+
+from src.web_driver.config import SCRAPE_BACKEND
+from src.web_driver.cookies import session_expiry
+from src.web_driver.driver import create_firefox
+from src.web_driver.executor import ScrapeExecutor
+from src.web_driver.http_driver import HTTPMultiPageDriver
+from src.web_driver.multi_page_driver import MultiPageDriver
+from src.web_driver.pool import POOL_MAX_USES, reset_browser
+from utils.archive import PageArchive, fetched_at
+from utils.html_parser import AttendanceParser, ProfileParser, TimeTableParser
+
+if TYPE_CHECKING:
+    from selenium.webdriver.firefox.webdriver import WebDriver as FireFoxWebDriver
+
+    from src.web_driver.typehints import Cookie, PageName, ScrapeResult
+    from utils.typehints import TimeTableGetData, TimeTableHashes
+
+# Everything in this module runs inside the worker processes of
+# ``Router(processes=...)``: login, download, archiving and parsing happen
+# there and only the parsed records travel back to the API process.
+
+
+def _parse_timetable(page_source: str) -> tuple[TimeTableHashes, TimeTableGetData]:
+    # the API process compares the hashes and skips the unchanged tables
+    parser = TimeTableParser(page_source)
+    return parser.get_table_hashes(), parser.get_data()
+
+
+PARSERS: Final[dict[PageName, Callable[[str], Any]]] = {
+    "profile": lambda page_source: ProfileParser(page_source).get_data(),
+    "timetable": _parse_timetable,
+    "attendance": lambda page_source: AttendanceParser(page_source).get_data(),
+}
+
+log = logging.getLogger(__name__)
+
+# one warm browser per worker process, recycled like a ``DriverPool`` session
+_browser: FireFoxWebDriver | None = None
+_browser_uses = 0
+
+# set up by ``init_worker``. The loop outlives a single scrape so the rate
+# limiter of the executor keeps its budget from one student to the next.
+_loop: asyncio.AbstractEventLoop | None = None
+_executor: ScrapeExecutor | None = None
+
+
+def init_worker(requests_per_second: float) -> None:
+    # the initializer of the process pool, ``requests_per_second`` is this
+    # worker's share of the portal's request budget
+    global _loop, _executor
+
+    _loop = asyncio.new_event_loop()
+    _executor = ScrapeExecutor(
+        max_sessions=1, max_threads=1, requests_per_second=requests_per_second
+    )
+    # pool workers are spawned, they run the atexit hooks when the pool shuts down
+    atexit.register(_close_worker)
+
+
+def _close_worker() -> None:
+    _discard_browser()
+    if _executor is not None:
+        _executor.shutdown()
+    if _loop is not None:
+        _loop.close()
+
+
+def _checkout_browser() -> FireFoxWebDriver:
+    global _browser, _browser_uses
+
+    if _browser is None or _browser_uses >= POOL_MAX_USES:
+        _discard_browser()
+        _browser = create_firefox()
+        _browser_uses = 0
+
+    _browser_uses += 1
+    return _browser
+
+
+def _discard_browser() -> None:
+    global _browser
+
+    if _browser is not None:
+        try:
+            _browser.quit()
+        except WebDriverException:
+            log.debug("worker browser was already gone")
+    _browser = None
+
+
+async def _scrape_selenium(
+    admission_number: str,
+    password: str,
+    pages: tuple[PageName, ...],
+    cookies: list[Cookie] | None,
+    executor: ScrapeExecutor,
+) -> tuple[dict[PageName, str], list[Cookie], int, float]:
+    browser = _checkout_browser()
+    driver = MultiPageDriver(admission_number, password, pages=pages, driver=browser)
+    try:
+        page_sources = {
+            page: html
+            async for page, html in driver.iter_pages(cookies, executor=executor)
+        }
+        new_cookies = await executor.run(driver.get_cookies)
+    except WebDriverException:
+        _discard_browser()
+        raise
+    finally:
+        # whatever happened, the next student must not get this session
+        if _browser is browser:
+            try:
+                await executor.run(reset_browser, browser)
+            except Exception:
+                log.warning("could not reset the worker browser, discarding it")
+                _discard_browser()
+
+    return page_sources, new_cookies, driver.bytes_downloaded, driver.page_load_time
+
+
+async def _scrape_http(
+    admission_number: str,
+    password: str,
+    pages: tuple[PageName, ...],
+    cookies: list[Cookie] | None,
+    executor: ScrapeExecutor,
+) -> tuple[dict[PageName, str], list[Cookie], int, float]:
+    async with HTTPMultiPageDriver(
+        admission_number, password, pages=pages, executor=executor
+    ) as driver:
+        page_sources = await driver.download_pages(cookies)
+        return (
+            page_sources,
+            driver.get_cookies(),
+            driver.bytes_downloaded,
+            driver.page_load_time,
+        )
+
+
+def scrape_student(
+    admission_number: str,
+    password: str,
+    pages: tuple[PageName, ...],
+    cookies: list[Cookie] | None = None,
+) -> ScrapeResult:
+    if _loop is None or _executor is None:
+        raise RuntimeError("scrape_student runs in a pool set up with init_worker")
+
+    # every request of the scrape is throttled by this worker's executor
+    scrape = _scrape_http if SCRAPE_BACKEND == "http" else _scrape_selenium
+    scraped = _loop.run_until_complete(
+        scrape(admission_number, password, pages, cookies, _executor)
+    )
+
+    page_sources, new_cookies, bytes_downloaded, page_load_time = scraped
+    archive = PageArchive()
+    # archived before parsing, a page the parser fails on is still indexed by
+    # the API process and can be replayed
+    archived = {page: archive.store(html) for page, html in page_sources.items()}
+
+    pages: dict[PageName, Any] = {}
+    failed: dict[PageName, str] = {}
+    for page, html in page_sources.items():
+        try:
+            pages[page] = PARSERS[page](html)
+        except Exception:
+            failed[page] = traceback.format_exc()
+
+    return {
+        "pages": pages,
+        "failed": failed,
+        "archived": archived,
+        "fetched_at": fetched_at(),
+        "cookies": new_cookies,
+        "expires_at": session_expiry(new_cookies),
+        "bytes_downloaded": bytes_downloaded,
+        "page_load_time": page_load_time,
+    }
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from utils.timetable_index import _build
+
+CLASS = "B.Tech CSE Sem 3"
+
+
+def _row(
+    alternative: int,
+    start_ts: int,
+    faculty_name: str,
+    alternative_faculty_name: str | None = None,
+    *,
+    section: int = 1,
+) -> tuple:
+    # the columns of ``get_timetable_rows``
+    return (
+        alternative,
+        0,
+        CLASS,
+        section,
+        start_ts,
+        start_ts + 3000,
+        f"start {start_ts}",
+        f"end {start_ts}",
+        faculty_name,
+        alternative_faculty_name,
+        "CSE101",
+        "Programming",
+        "Theory",
+        "A-101",
+    )
+
+
+def test_alternative_replaces_main_slot_with_other_faculty_text():
+    sections = _build(
+        [
+            _row(0, 1000, "Dr. A Kumar"),
+            _row(0, 5000, "Dr. B Singh"),
+            # the portal's "original faculty" text differs from the main row
+            _row(1, 1000, "A Kumar", "Dr. C Verma"),
+        ]
+    )
+
+    section = sections[(CLASS, 1)]
+    assert len(section) == 2
+    assert section.current(1500)["faculty_name"] == "Dr. C Verma"  # type: ignore
+    assert section.current(5500)["faculty_name"] == "Dr. B Singh"  # type: ignore
+
+
+def test_alternative_without_main_slot_is_added():
+    sections = _build(
+        [
+            _row(0, 1000, "Dr. A Kumar"),
+            _row(1, 5000, "Dr. B Singh", "Dr. C Verma"),
+            _row(1, 1000, "Dr. A Kumar", "Dr. D Rao", section=2),
+        ]
+    )
+
+    assert [row["faculty_name"] for row in sections[(CLASS, 1)].rows] == [
+        "Dr. A Kumar",
+        "Dr. C Verma",
+    ]
+    assert [row["faculty_name"] for row in sections[(CLASS, 2)].rows] == ["Dr. D Rao"]
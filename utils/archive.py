@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, Final, Iterable, Iterator
+
+try:
+    import zstandard  # type: ignore
+
+    COMPRESSION = "zst"
+except ImportError:
+    zstandard = None
+    COMPRESSION = "gz"
+
+ARCHIVE_PATH: Final = pathlib.Path(__file__).parent.parent / "archive"
+EXPIRED_PATH: Final = ARCHIVE_PATH / "expired"
+
+log = logging.getLogger("__name__")
+
+
+def fetched_at() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zst":
+        return zstandard.ZstdCompressor(level=10).compress(data)  # type: ignore
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst archive entries")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageArchive:
+    def __init__(self, root: str | pathlib.Path = ARCHIVE_PATH) -> None:
+        self.root = pathlib.Path(root)
+
+    def __repr__(self) -> str:
+        return f"<PageArchive root={str(self.root)!r} compression={COMPRESSION!r}>"
+
+    @staticmethod
+    def digest(page_source: str) -> str:
+        return hashlib.sha256(page_source.encode("utf-8")).hexdigest()
+
+    def _path(self, digest: str, compression: str) -> pathlib.Path:
+        return self.root / digest[:2] / f"{digest}.html.{compression}"
+
+    def __contains__(self, digest: str) -> bool:
+        return any(
+            self._path(digest, compression).exists() for compression in ("zst", "gz")
+        )
+
+    def store(self, page_source: str) -> str:
+        digest = self.digest(page_source)
+        if digest in self:
+            log.debug("page %s is already archived", digest)
+            return digest
+
+        path = self._path(digest, COMPRESSION)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first so that concurrent writers (worker
+        # processes) never expose a half written entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(_compress(page_source.encode("utf-8"), COMPRESSION))
+        os.replace(tmp_path, path)
+
+        log.info("archived page %s", digest)
+        return digest
+
+    def load(self, digest: str) -> str:
+        for compression in ("zst", "gz"):
+            path = self._path(digest, compression)
+            if path.exists():
+                return _decompress(path.read_bytes(), compression).decode("utf-8")
+
+        raise KeyError(digest)
+
+
+def _week(start_time: str) -> str:
+    day = datetime.strptime(start_time[:10], "%Y-%m-%d")
+    return (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+
+
+class ExpiredRowsArchive:
+    # rows removed by the retention job, one JSON-lines file per table and
+    # week. Every append adds a compressed frame (a gzip member or a zstd
+    # frame) to the file, both formats read back as one stream.
+    def __init__(self, root: str | pathlib.Path = EXPIRED_PATH) -> None:
+        self.root = pathlib.Path(root)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ExpiredRowsArchive root={str(self.root)!r} "
+            f"compression={COMPRESSION!r}>"
+        )
+
+    def _path(self, table: str, week: str, compression: str) -> pathlib.Path:
+        return self.root / table / f"{week}.jsonl.{compression}"
+
+    def append(self, table: str, rows: Iterable[dict[str, Any]]) -> int:
+        weeks: dict[str, list[str]] = {}
+        for row in rows:
+            weeks.setdefault(_week(row["start_time"]), []).append(
+                json.dumps(row, separators=(",", ":"))
+            )
+
+        for week, lines in weeks.items():
+            path = self._path(table, week, COMPRESSION)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = "".join(f"{line}\n" for line in lines).encode("utf-8")
+            with path.open("ab") as file:
+                file.write(_compress(data, COMPRESSION))
+                file.flush()
+                os.fsync(file.fileno())
+
+        archived = sum(len(lines) for lines in weeks.values())
+        log.debug("archived %s expired %s rows", archived, table)
+        return archived
+
+    def load(self, table: str, week: str) -> Iterator[dict[str, Any]]:
+        for compression in ("zst", "gz"):
+            path = self._path(table, week, compression)
+            if not path.exists():
+                continue
+
+            if compression == "gz":
+                stream = gzip.open(path, "rt", encoding="utf-8")
+            elif zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst archive entries")
+            else:
+                reader = zstandard.ZstdDecompressor().stream_reader(
+                    path.open("rb"), read_across_frames=True, closefd=True
+                )
+                stream = io.TextIOWrapper(reader, encoding="utf-8")
+
+            with stream:
+                for line in stream:
+                    yield json.loads(line)
@@ -1,25 +1,56 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Final, Iterable, Iterator, Mapping
 
-from aiosqlite import Connection
+from aiosqlite import Connection, Cursor
 
 if TYPE_CHECKING:
     from typing_extensions import Unpack
 
+    from src.web_driver.typehints import Cookie
+
     from .typehints import (
-        AlternativeArrangement,
-        Arrangement,
+        AttendanceGetData,
+        AttendanceReturnData,
         Credentials,
-        TimeTableReturnData,
+        SlotType,
+        TimeTableGetData,
+        TimeTableHashes,
     )
 
 import logging
 
-from .html_parser import _SlotParser
-
 log = logging.getLogger("__name__")
 
+# 6 parameters per slot, below the 999 bound parameters older SQLite allows
+SLOTS_PER_STATEMENT: Final = 150
+
+# the timetable text columns hold the portal's local time
+PORTAL_TIMEZONE: Final = timezone(timedelta(hours=5, minutes=30))
+
+
+@lru_cache(maxsize=4096)
+def to_timestamp(value: str | None) -> int | None:
+    if value is None:
+        return None
+
+    dt = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return int(dt.replace(tzinfo=PORTAL_TIMEZONE).timestamp())
+
+
+async def execute_query(
+    connection: Connection, query: str, query_args: tuple = ()
+) -> list[tuple]:
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    return list(await cur.fetchall())
+
 
 async def insert_credential(connection: Connection, **data: Unpack[Credentials]):
     query = """
@@ -40,13 +71,10 @@ async def insert_credential(connection: Connection, **data: Unpack[Credentials])
 
     result = await cur.fetchone()
 
-    log.debug("committing changes")
-    await connection.commit()
-
     # why not return the result directly?
     #
     # When you use RETURNING with SQLite3,
-    # the result have to be used before you commit the transaction or this error will occur.
+    # the result have to be used before the transaction is committed or this error will occur.
     
     return result
 
@@ -69,156 +97,656 @@ async def update_credentials(connection: Connection, **data: Unpack[Credentials]
     cursor = await connection.cursor()
     await cursor.execute(query, query_args)
 
-    log.debug("committing changes")
-    await connection.commit()
 
+async def delete_credentials(connection: Connection, admission_number: str) -> bool:
+    cursor = await connection.cursor()
+    deleted = 0
+    for table in ("students_credentials", "students"):
+        query = f"""DELETE FROM {table} WHERE admission_number = ?"""
+        log.debug("executing sql query %s with args %s", query, (admission_number,))
+        cur = await cursor.execute(query, (admission_number,))
+        deleted += cur.rowcount
 
-async def insert_main_timetable(
-    connection: Connection, **raw_data: Unpack[Arrangement]
-):
-    # sourcery skip: inline-immediately-yielded-variable
-    log.info("inserting main timetable %s", raw_data)
-    for _, arrangements in raw_data.items():
-        assert isinstance(arrangements, list)
-        if not arrangements:
-            continue
-        cursor = await connection.cursor()
-        for data in arrangements:
-            query = _SlotParser.from_dict_to_sql(data["slot"])
-            log.debug("executing sql query %s", query)
-
-            cur = await cursor.execute(query)
-            slot_id = await cur.fetchone()
-            if slot_id is None:
-                raise RuntimeError("Invalid slot data")
-
-            timetable_query = """
-                INSERT INTO timetable
-                    (start_time, end_time, faculty_name, slot_id, class)
-                VALUES
-                    (?, ?, ?, ?, ?)
-                ON CONFLICT DO NOTHING
-            """
-            timetable_query_args = (
-                data["start_time"],
-                data["end_time"],
-                data["faculty_name"],
-                slot_id[0],
-                data["class"],
-            )
-            log.debug(
-                "executing sql query %s with args %s",
-                timetable_query,
-                timetable_query_args,
-            )
-            cur = await cursor.execute(timetable_query, timetable_query_args)
+    return deleted > 0
+
+
+async def get_session_cookies(
+    connection: Connection, admission_number: str
+) -> list[Cookie] | None:
+    # returned whatever ``expires_at`` says: it is only an estimate and the
+    # drivers fall back to logging in when the portal shows the login form
+    query = """
+        SELECT cookies FROM students_sessions
+        WHERE
+            admission_number = ?
+    """
+    query_args = (admission_number,)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    row = await cur.fetchone()
+    return None if row is None else json.loads(row[0])
+
+
+async def save_session_cookies(
+    connection: Connection,
+    *,
+    admission_number: str,
+    cookies: list[Cookie],
+    expires_at: int,
+) -> None:
+    query = """
+        INSERT INTO students_sessions
+            (admission_number, cookies, expires_at)
+        VALUES
+            (?, ?, ?)
+        ON CONFLICT DO UPDATE SET
+            cookies = excluded.cookies,
+            expires_at = excluded.expires_at
+    """
+    query_args = (admission_number, json.dumps(cookies), expires_at)
+
+    log.info("saving session of %s until %s", admission_number, expires_at)
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, query_args)
+
+
+async def delete_session_cookies(connection: Connection, admission_number: str) -> None:
+    query = """DELETE FROM students_sessions WHERE admission_number = ?"""
+    log.debug("executing sql query %s with args %s", query, (admission_number,))
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, (admission_number,))
+
+
+async def insert_archived_page(
+    connection: Connection,
+    *,
+    sha256: str,
+    admission_number: str,
+    class_: str | None,
+    page_type: str,
+    fetched_at: str,
+) -> None:
+    query = """
+        INSERT INTO page_archive
+            (sha256, admission_number, class, page_type, fetched_at)
+        VALUES
+            (?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+    """
+    query_args = (sha256, admission_number, class_, page_type, fetched_at)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, query_args)
+
+
+async def set_archived_page_class(
+    connection: Connection,
+    *,
+    sha256: str,
+    admission_number: str,
+    class_: str | None,
+    page_type: str,
+    fetched_at: str,
+) -> None:
+    # the row is indexed before its page is parsed, the class is only known
+    # once it was
+    query = """
+        UPDATE page_archive
+        SET
+            class = ?
+        WHERE
+            sha256 = ? AND admission_number = ? AND page_type = ? AND fetched_at = ?
+    """
+    query_args = (class_, sha256, admission_number, page_type, fetched_at)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, query_args)
+
+
+async def get_archived_pages(
+    connection: Connection,
+    *,
+    page_types: Iterable[str],
+    class_: str | None = None,
+    since: str | None = None,
+) -> list[tuple[str, str, str]]:
+    page_types = tuple(page_types)
+    query = f"""
+        SELECT sha256, page_type, admission_number FROM page_archive
+        WHERE
+            page_type IN ({", ".join("?" * len(page_types))})
+            AND (? IS NULL OR class = ?)
+            AND (? IS NULL OR datetime(fetched_at) >= datetime(?))
+        GROUP BY
+            sha256, page_type, admission_number
+        ORDER BY
+            MIN(fetched_at)
+    """
+    query_args = (*page_types, class_, class_, since, since)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    return [tuple(row) async for row in cur]  # type: ignore
+
+
+async def get_credential_section(
+    connection: Connection, admission_number: str
+) -> int | None:
+    query = """SELECT section FROM students_credentials WHERE admission_number = ?"""
+    log.debug("executing sql query %s with args %s", query, (admission_number,))
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, (admission_number,))
+    row = await cur.fetchone()
+    return None if row is None else row[0]
+
+
+async def get_timetable_hashes(
+    connection: Connection, *, class_: str, section: int, week: str
+) -> TimeTableHashes | None:
+    query = """
+        SELECT main_hash, alternative_hash, details_hash FROM timetable_hashes
+        WHERE
+            class = ? AND section = ? AND week = ?
+    """
+    query_args = (class_, section, week)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    row = await cur.fetchone()
+    if row is None:
+        return None
+
+    main_hash, alternative_hash, details_hash = row
+    return {
+        "class": class_,
+        "week": week,
+        "main_hash": main_hash,
+        "alternative_hash": alternative_hash,
+        "details_hash": details_hash,
+    }
+
+
+async def save_timetable_hashes(
+    connection: Connection, *, section: int, **hashes: Unpack[TimeTableHashes]
+) -> None:
+    query = """
+        INSERT INTO timetable_hashes
+            (class, section, week, main_hash, alternative_hash, details_hash)
+        VALUES
+            (?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO UPDATE SET
+            main_hash = excluded.main_hash,
+            alternative_hash = excluded.alternative_hash,
+            details_hash = excluded.details_hash
+    """
+    query_args = (
+        hashes["class"],
+        section,
+        hashes["week"],
+        hashes["main_hash"],
+        hashes["alternative_hash"],
+        hashes["details_hash"],
+    )
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, query_args)
+
+
+async def delete_timetable_hashes(
+    connection: Connection, *, class_: str | None = None
+) -> None:
+    query = """DELETE FROM timetable_hashes WHERE ? IS NULL OR class = ?"""
+    log.debug("executing sql query %s with args %s", query, (class_, class_))
+
+    cursor = await connection.cursor()
+    await cursor.execute(query, (class_, class_))
 
-        log.debug("committing changes")
-        await connection.commit()
 
+def _slot_key(slot: SlotType) -> tuple:
+    # the columns of the UNIQUE constraint of ``slots``
+    return (
+        slot["course_code"],
+        slot["section"],
+        slot["course_type"],
+        slot["room"],
+        slot["block"],
+    )
 
-async def insert_alternative_arrangement(
-    connection: Connection, **data: Unpack[AlternativeArrangement]
-):
-    # sourcery skip: inline-immediately-yielded-variable
-    log.info("inserting alternative timetable %s", data)
 
-    for _, arrangements in data.items():
-        assert isinstance(arrangements, list)
-        if not arrangements:
-            continue
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+async def _upsert_slots(cursor: Cursor, slots: list[SlotType]) -> dict[tuple, int]:
+    slot_ids: dict[tuple, int] = {}
+    for chunk in _chunks(slots, SLOTS_PER_STATEMENT):
+        query = f"""
+            INSERT INTO slots
+                (course_name, course_type, course_code, section, room, block)
+            VALUES
+                {", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk))}
+            ON CONFLICT DO UPDATE SET
+                course_name = excluded.course_name
+        """
+        query_args = [
+            value
+            for slot in chunk
+            for value in (
+                slot["course_name"],
+                slot["course_type"],
+                slot["course_code"],
+                slot["section"],
+                slot["room"],
+                slot["block"],
+            )
+        ]
+        log.debug("upserting %s slots", len(chunk))
+        await cursor.execute(query, query_args)
+
+        query = f"""
+            SELECT
+                id, course_code, section, course_type, room, block
+            FROM
+                slots
+            WHERE
+                (course_code, section, course_type, room, block) IN (
+                    VALUES {", ".join(["(?, ?, ?, ?, ?)"] * len(chunk))}
+                )
+        """
+        query_args = [value for slot in chunk for value in _slot_key(slot)]
+        cur = await cursor.execute(query, query_args)
+        async for slot_id, *key in cur:
+            slot_ids[tuple(key)] = slot_id
+
+    return slot_ids
+
+
+class SlotCache:
+    # slot key -> (id, course_name) of every row in ``slots``. Only slots
+    # missing here or with a different course name are written to SQLite.
+    def __init__(self) -> None:
+        self._slots: dict[tuple, tuple[int, str]] = {}
+
+    def __repr__(self) -> str:
+        return f"<SlotCache slots={len(self._slots)}>"
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    async def load(self, connection: Connection) -> None:
+        query = """
+            SELECT
+                id, course_name, course_code, section, course_type, room, block
+            FROM
+                slots
+        """
+        log.debug("executing sql query %s", query)
 
         cursor = await connection.cursor()
+        cur = await cursor.execute(query)
+        self._slots = {
+            tuple(key): (slot_id, course_name)
+            async for slot_id, course_name, *key in cur
+        }
+        log.info("loaded %s slots", len(self._slots))
+
+    def get(self, slot: SlotType) -> int | None:
+        cached = self._slots.get(_slot_key(slot))
+        if cached is None or cached[1] != slot["course_name"]:
+            return None
+        return cached[0]
+
+    def update(self, slots: Iterable[SlotType], slot_ids: dict[tuple, int]) -> None:
+        for slot in slots:
+            key = _slot_key(slot)
+            self._slots[key] = (slot_ids[key], slot["course_name"])
+
+
+async def insert_timetable(
+    connection: Connection,
+    *,
+    slot_cache: SlotCache | None = None,
+    **data: Unpack[TimeTableGetData],
+) -> tuple[list[SlotType], dict[tuple, int]]:
+    main_rows = [row for rows in data["timetable"].values() for row in rows]
+    alternative_rows = [
+        row for rows in data["alternative_timetable"].values() for row in rows
+    ]
+    if not main_rows and not alternative_rows:
+        return [], {}
+
+    slots = {
+        _slot_key(row["slot"]): row["slot"] for row in [*main_rows, *alternative_rows]
+    }
+    log.info(
+        "inserting %s timetable rows and %s alternative rows with %s slots",
+        len(main_rows),
+        len(alternative_rows),
+        len(slots),
+    )
+
+    timetable_query = """
+        INSERT INTO timetable
+            (start_time, end_time, start_ts, end_ts, faculty_name, slot_id, class)
+        VALUES
+            (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+    """
+    alternate_timetable_query = """
+        INSERT INTO alternative_timetable
+            (start_time, end_time, start_ts, end_ts, faculty_name, alternative_faculty_name, slot_id, class)
+        VALUES
+            (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+    """
+
+    slot_ids: dict[tuple, int] = {}
+    pending: list[SlotType] = []
+    for key, slot in slots.items():
+        if slot_cache is not None and (slot_id := slot_cache.get(slot)) is not None:
+            slot_ids[key] = slot_id
+        else:
+            pending.append(slot)
 
-        for arrangement in arrangements:
-            query = _SlotParser.from_dict_to_sql(arrangement["slot"])
-            log.debug("executing sql query %s", query)
-            cur = await cursor.execute(query)
-            slot_id = await cur.fetchone()
-            if slot_id is None:
-                raise RuntimeError("Invalid slot data")
-
-            alternate_timetable = """
-                INSERT INTO alternative_timetable
-                    (start_time, end_time, faculty_name, alternative_faculty_name, slot_id, class)
-                VALUES
-                    (?, ?, ?, ?, ?, ?)
-                ON CONFLICT DO NOTHING
-            """
-            alternate_timetable_args = (
-                arrangement["start_time"],
-                arrangement["end_time"],
-                arrangement["faculty_name"],
-                arrangement["alternate_faculty_name"],
-                slot_id[0],
-                arrangement["class"],
+    cursor = await connection.cursor()
+    if pending:
+        log.debug("writing %s new or changed slots", len(pending))
+        slot_ids.update(await _upsert_slots(cursor, pending))
+    if missing := slots.keys() - slot_ids.keys():
+        raise RuntimeError(f"Invalid slot data {missing}")
+
+    await cursor.executemany(
+        timetable_query,
+        [
+            (
+                row["start_time"],
+                row["end_time"],
+                to_timestamp(row["start_time"]),  # type: ignore
+                to_timestamp(row["end_time"]),  # type: ignore
+                row["faculty_name"],
+                slot_ids[_slot_key(row["slot"])],
+                row["class"],
             )
-            log.debug(
-                "executing sql query %s with args %s",
-                alternate_timetable,
-                alternate_timetable_args,
+            for row in main_rows
+        ],
+    )
+    await cursor.executemany(
+        alternate_timetable_query,
+        [
+            (
+                row["start_time"],
+                row["end_time"],
+                to_timestamp(row["start_time"]),  # type: ignore
+                to_timestamp(row["end_time"]),  # type: ignore
+                row["faculty_name"],
+                row["alternate_faculty_name"],
+                slot_ids[_slot_key(row["slot"])],
+                row["class"],
             )
-            cur = await cursor.execute(alternate_timetable, alternate_timetable_args)
+            for row in alternative_rows
+        ],
+    )
 
-        log.debug("committing changes")
-        await connection.commit()
+    # the ids are cached by the caller once the write is committed
+    return pending, slot_ids
 
 
-async def get_current_timetable(
-    connection: Connection, admission_number: str
-) -> TimeTableReturnData:
-    if len(admission_number) > 14:
-        raise ValueError("Invalid admission number")
+async def insert_attendance(
+    connection: Connection, attendance: Mapping[str, AttendanceGetData]
+) -> None:
+    # ``attendance`` maps admission numbers to their parsed attendance page,
+    # every student in it is written in a single transaction
+    courses_query = """
+        INSERT INTO courses
+            (course_code, course_name)
+        VALUES
+            (?, ?)
+        ON CONFLICT DO UPDATE SET
+            course_name = excluded.course_name
+    """
+    courses_query_args = {
+        (subject["course_code"], subject["course_name"])
+        for data in attendance.values()
+        for subject in data["subjects"]
+    }
+
+    # the section comes from the credentials, students without credentials
+    # select no row and are skipped
+    attendance_query = """
+        INSERT INTO attendance
+            (admission_number, class, section, course_code, total_classes, attended_classes)
+        SELECT
+            SC.admission_number, ?, SC.section, ?, ?, ?
+        FROM
+            students_credentials AS SC
+        WHERE
+            SC.admission_number = ?
+        ON CONFLICT DO UPDATE SET
+            total_classes = excluded.total_classes,
+            attended_classes = excluded.attended_classes
+    """
+    attendance_query_args = [
+        (
+            data["class"],
+            subject["course_code"],
+            subject["total_classes"],
+            subject["attended_classes"],
+            admission_number,
+        )
+        for admission_number, data in attendance.items()
+        for subject in data["subjects"]
+    ]
+
+    refreshed_query = """
+        UPDATE students_credentials
+        SET
+            attendance_refreshed_at = ?
+        WHERE
+            admission_number = ?
+    """
+    now = int(time.time())
+
+    log.info(
+        "inserting %s attendance rows of %s students",
+        len(attendance_query_args),
+        len(attendance),
+    )
+    log.debug("executing sql query %s", attendance_query)
 
+    cursor = await connection.cursor()
+    await cursor.executemany(courses_query, courses_query_args)
+    await cursor.executemany(attendance_query, attendance_query_args)
+    await cursor.executemany(
+        refreshed_query, [(now, admission_number) for admission_number in attendance]
+    )
+
+
+async def get_attendance(
+    connection: Connection, admission_number: str
+) -> list[AttendanceReturnData]:
     query = """
         SELECT
-            TT.start_time, TT.end_time, TT.faculty_name, TT.class, S.course_code, S.course_name, S.course_type, S.room
-        FROM 
-            timetable AS TT
-        JOIN 
-            slots AS S
+            A.class, A.section, A.course_code, C.course_name, A.total_classes, A.attended_classes
+        FROM
+            attendance AS A
+        LEFT JOIN
+            courses AS C
         ON
-            TT.slot_id = S.id
-        WHERE 
-            datetime('now') BETWEEN datetime(TT.start_time) AND datetime(TT.end_time)
-            AND
-            S.section in (
-                SELECT
-                    SA.section
-                FROM
-                    students_credentials AS SA
-                WHERE
-                    SA.admission_number = ?
-                    AND
-                    SA.class = TT.class
-            ) 
+            C.course_code = A.course_code
+        WHERE
+            A.admission_number = ?
+        ORDER BY
+            A.course_code
     """
     log.debug("executing sql query %s with args %s", query, (admission_number,))
-    cursor = await connection.cursor()
 
+    cursor = await connection.cursor()
     cur = await cursor.execute(query, (admission_number,))
-    data: TimeTableReturnData = {}  # type: ignore
-    async for (
-        start_time,
-        end_time,
-        faculty_name,
-        class_,
-        course_code,
-        course_name,
-        course_type,
-        room,
-    ) in cur:
-        data = {
-            "start_time": start_time,
-            "end_time": end_time,
-            "faculty_name": faculty_name,
+    return [
+        {
             "class": class_,
+            "section": section,
             "course_code": course_code,
             "course_name": course_name,
-            "course_type": course_type,
-            "room": room,
+            "total_classes": total_classes,
+            "attended_classes": attended_classes,
+            "percentage": (
+                round(attended_classes * 100 / total_classes, 2)
+                if total_classes
+                else 0.0
+            ),
         }
+        async for (
+            class_,
+            section,
+            course_code,
+            course_name,
+            total_classes,
+            attended_classes,
+        ) in cur
+    ]
+
+
+async def get_student_sections(
+    connection: Connection, admission_number: str | None = None
+) -> list[tuple[str, str, int]]:
+    # (admission number, class, section) of every student, or of one
+    query = """
+        SELECT
+            ST.admission_number, ST.class, SC.section
+        FROM
+            students AS ST
+        JOIN
+            students_credentials AS SC
+        ON
+            SC.admission_number = ST.admission_number
+        WHERE
+            :admission_number IS NULL OR ST.admission_number = :admission_number
+    """
+    query_args = {"admission_number": admission_number}
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    return list(await cur.fetchall())  # type: ignore
+
+
+async def get_timetable_rows(
+    connection: Connection, *, class_: str | None = None
+) -> list[tuple]:
+    # the main and the alternative rows of one class (or all of them) with
+    # their slot, main rows first and each part in insertion order
+    query = """
+        SELECT
+            0, TT.id, TT.class, S.section, TT.start_ts, TT.end_ts, TT.start_time, TT.end_time, TT.faculty_name, NULL, S.course_code, S.course_name, S.course_type, S.room
+        FROM
+            timetable AS TT
+        JOIN
+            slots AS S
+        ON
+            S.id = TT.slot_id
+        WHERE
+            :class IS NULL OR TT.class = :class
+
+        UNION ALL
+
+        SELECT
+            1, AT.id, AT.class, S.section, AT.start_ts, AT.end_ts, AT.start_time, AT.end_time, AT.faculty_name, AT.alternative_faculty_name, S.course_code, S.course_name, S.course_type, S.room
+        FROM
+            alternative_timetable AS AT
+        JOIN
+            slots AS S
+        ON
+            S.id = AT.slot_id
+        WHERE
+            :class IS NULL OR AT.class = :class
+
+        ORDER BY
+            1, 2
+    """
+    query_args = {"class": class_}
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    return list(await cur.fetchall())
+
+
+def _expired_query(table: str) -> str:
+    # ``table`` is one of the timetable tables, never user input. The oldest
+    # rows come first, the ``start_ts`` index serves both the filter and the
+    # order so each chunk is a short range scan.
+    return f"""
+        SELECT
+            id
+        FROM
+            {table}
+        WHERE
+            start_ts < ?
+        ORDER BY
+            start_ts
+        LIMIT ?
+    """
+
+
+async def get_expired_rows(
+    connection: Connection, *, table: str, before: int, limit: int
+) -> list[dict]:
+    query = f"""SELECT * FROM {table} WHERE id IN ({_expired_query(table)})"""
+    query_args = (before, limit)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    columns = [column[0] for column in cur.description]
+    return [dict(zip(columns, row)) async for row in cur]
+
+
+async def delete_rows(connection: Connection, *, table: str, ids: list[int]) -> int:
+    query = f"""DELETE FROM {table} WHERE id IN ({", ".join("?" * len(ids))})"""
+    log.debug("executing sql query %s with args %s", query, ids)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, ids)
+    return cur.rowcount
 
-    log.debug("committing changes")
-    await connection.commit()
-    return data
+
+async def delete_expired_rows(
+    connection: Connection, *, table: str, before: int, limit: int
+) -> int:
+    query = f"""DELETE FROM {table} WHERE id IN ({_expired_query(table)})"""
+    query_args = (before, limit)
+    log.debug("executing sql query %s with args %s", query, query_args)
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, query_args)
+    return cur.rowcount
+
+
+async def delete_expired_timetable_hashes(
+    connection: Connection, *, before: int
+) -> int:
+    # forget the hashes of the weeks being removed, otherwise a scrape of
+    # such a week would be skipped and never re-inserted
+    query = """
+        DELETE FROM
+            timetable_hashes
+        WHERE
+            date(week) < date(?, 'unixepoch', '+5 hours', '+30 minutes')
+    """
+    log.debug("executing sql query %s with args %s", query, (before,))
+
+    cursor = await connection.cursor()
+    cur = await cursor.execute(query, (before,))
+    return cur.rowcount
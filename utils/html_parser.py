@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import hashlib
 import re
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Callable, Final, Iterable, NamedTuple
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from bs4.element import Tag
 
 if TYPE_CHECKING:
     from .typehints import (
         AlternativeArrangement,
         Arrangement,
+        AttendanceData,
+        AttendanceGetData,
+        ParserEngine,
         ProfileType,
         SlotType,
         TimeTableGetData,
+        TimeTableHashes,
+        TimeTableRows,
     )
 
 try:
@@ -29,15 +36,79 @@ import logging
 log = logging.getLogger("__name__")
 
 
+def _full_soup(html_source: str, parse_only: SoupStrainer | None) -> BeautifulSoup:
+    return BeautifulSoup(html_source, HTML_PARSER)
+
+
+def _strained_soup(html_source: str, parse_only: SoupStrainer | None) -> BeautifulSoup:
+    # only the nodes matched by ``parse_only`` (and their children) are built,
+    # the portal scripts and navigation around them are skipped
+    return BeautifulSoup(html_source, HTML_PARSER, parse_only=parse_only)
+
+
+ENGINES: Final[
+    dict[ParserEngine, Callable[[str, SoupStrainer | None], BeautifulSoup]]
+] = {
+    "full": _full_soup,
+    "strained": _strained_soup,
+}
+DEFAULT_ENGINE: Final[ParserEngine] = "strained"
+
+DAYS: Final = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# AttendanceData key -> header of the attendance table column
+ATTENDANCE_COLUMNS: Final = {
+    "course_code": "subject code",
+    "course_name": "subject name",
+    "total_classes": "total classes",
+    "attended_classes": "attended",
+}
+
+
+def _parse_time(raw: str) -> timedelta | None:
+    if not raw.strip():
+        return None
+
+    parts = raw.split(":")
+    return timedelta(hours=int(parts[0]), minutes=int(parts[1]))
+
+
+# the same handful of periods and dates repeat on every row of every page
+@lru_cache(maxsize=512)
+def _parse_time_range(raw: str) -> tuple[timedelta | None, timedelta | None]:
+    start_time, end_time = raw.split("-")
+    return _parse_time(start_time), _parse_time(end_time)
+
+
+@lru_cache(maxsize=512)
+def _parse_date(raw: str) -> datetime:
+    return datetime.strptime(raw, "%Y-%m-%d")
+
+
+@lru_cache(maxsize=4096)
+def _datetime_to_sqlite_string(dt: datetime | None) -> str | None:
+    return None if dt is None else dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _row_cells(tr: Tag) -> tuple[str, ...]:
+    return tuple(td.text.strip() for td in tr.find_all("td"))
+
+
 class HTMLParser(ABC):
-    def __init__(self, html_source: str) -> None:
+    parse_only: SoupStrainer | None = None
+
+    def __init__(
+        self, html_source: str, *, engine: ParserEngine = DEFAULT_ENGINE
+    ) -> None:
         self.html_source = html_source
+        self.engine = engine
         log.debug(
-            "creating soup object with %s with %s parser",
+            "creating soup object with %s with %s parser and %s engine",
             f"{html_source[:20:]}...{html_source[-20::]}",
             HTML_PARSER,
+            engine,
         )
-        self.__soup = BeautifulSoup(html_source, HTML_PARSER)
+        self.__soup = ENGINES[engine](html_source, self.parse_only)
 
     @property
     def soup(self) -> BeautifulSoup:
@@ -51,9 +122,10 @@ class HTMLParser(ABC):
     def title(self) -> str:
         return self.__soup.title.string  # type: ignore
 
-    @property
+    @cached_property
     def body(self) -> Tag:
-        return self.__soup.find("body")  # type: ignore
+        # a strained soup has no <body>, the matched nodes sit at the top level
+        return self.__soup.find("body") or self.__soup  # type: ignore
 
     @abstractmethod
     def get_data(self) -> ...:
@@ -61,6 +133,10 @@ class HTMLParser(ABC):
 
 
 class ProfileParser(HTMLParser):
+    parse_only = SoupStrainer(
+        class_=["middle", "profile-user-info", "profile-info-row"]
+    )
+
     @property
     def name(self) -> str:
         span = self.body.find("span", **{"class": "middle"})  # type: ignore
@@ -108,8 +184,11 @@ class ProfileParser(HTMLParser):
         return data
 
     def create_sql_query(self, semicolon: bool = False) -> str:
+        return ProfileParser.data_to_sql_query(self.get_data(), semicolon)
+
+    @staticmethod
+    def data_to_sql_query(data: ProfileType, semicolon: bool = False) -> str:
         query = """INSERT INTO students ({}) VALUES ({}) ON CONFLICT DO NOTHING"""
-        data = self.get_data()
         columns = ", ".join(data.keys())
         values = ", ".join(
             repr(value) if isinstance(value, str) else str(value)
@@ -123,8 +202,14 @@ class ProfileParser(HTMLParser):
 
 
 class TableParser(HTMLParser):
+    parse_only = SoupStrainer("table")
+
+    @cached_property
+    def tables(self) -> list[Tag]:
+        return self.body.find_all("table")
+
     def get_table(self, index: int = 0) -> Tag:
-        return self.body.find_all("table")[index]
+        return self.tables[index]
 
 
 class _TimeTableParser(TableParser):
@@ -138,69 +223,25 @@ class _TimeTableParser(TableParser):
         return self.get_table(2)
 
 
-class _SlotParser:
-    def __init__(self, raw_text) -> None:
-        self._raw_text = raw_text
-        self.course_name: str = ""
-        self.course_type: str = ""
-        self.course_code: str = ""
-        self.section: str = ""
-        self.room: str = ""
-        self.block: str = ""
+# "Data Structures(R1UC302B-TH) 12 GU_C-301"
+SLOT_GRAMMAR: Final = re.compile(
+    r"\s*(?P<course_name>[^(]*?)\s*"
+    r"\((?P<course_code>[A-Z0-9]{8})-(?P<course_type>[A-Z]{2})\)\s*"
+    r"(?P<section>[0-9]+)\s+"
+    r"GU_(?P<room>(?P<block>[A-Z])-[0-9]{3})"
+)
+COURSE_CODE_REGEX: Final = re.compile(r"([A-Z0-9]{8})")
+ROOM_REGEX: Final = re.compile(r"([A-Z]{1})\-([0-9]{3})")
+SECTION_REGEX: Final = re.compile(r"([0-9]+)")
 
-        self._parse()
 
-    def __repr__(self) -> str:
-        return (
-            f"<SlotParser course_name={self.course_name!r} course_type={self.course_type!r} "
-            f"course_code={self.course_code!r} section={self.section!r} room={self.room!r} block={self.block!r}>"
-        )
-
-    def _parse_rest(self) -> None:
-        if "PR" in self._raw_text:
-            self._pr = True
-            self._raw_text = self._raw_text.replace("PR", "").strip()
-        if "PP" in self._raw_text:
-            self._pp = True
-            self._raw_text = self._raw_text.replace("PP", "").strip()
-
-    def _parse_course_name(self):
-        self.course_name = self._raw_text[: self._raw_text.find("(")].strip()
-        self._raw_text = self._raw_text.replace(self.course_name, "").strip()
-
-    def _parse_course_type(self):
-        index = self._raw_text.find(")")
-        self.course_type = self._raw_text[index - 2 : index].strip()
-        self._raw_text = self._raw_text.replace(self.course_type, "").strip()
-
-    def _parse_course_code(self):
-        regex = re.compile(r"([A-Z0-9]{8})")
-        if match := regex.search(self._raw_text):
-            self.course_code = match.group()
-            self._raw_text = self._raw_text.replace(self.course_code, "").strip()
-
-    def _parse_room(self):
-        self._raw_text = self._raw_text.replace("GU_", "")
-        regex = re.compile(r"([A-Z]{1})\-([0-9]{3})")
-        if match := regex.search(self._raw_text):
-            self.room = match[0]
-            self.block = match[1].replace(self.room, "").strip()
-            self._raw_text = self._raw_text.replace(match.group(), "").strip()
-
-    def _parse_section(self):
-        # catch remaining int
-        regex = re.compile(r"([0-9]+)")
-        if match := regex.search(self._raw_text):
-            self.section = match.group()
-            self._raw_text = self._raw_text.replace(match.group(), "").strip()
-
-    def _parse(self) -> None:
-        self._parse_course_name()
-        self._parse_course_type()
-        self._parse_course_code()
-        self._parse_room()
-        self._parse_rest()
-        self._parse_section()
+class _Slot(NamedTuple):
+    course_name: str
+    course_type: str
+    course_code: str
+    section: str
+    room: str
+    block: str
 
     def to_dict(self) -> SlotType:
         return {
@@ -212,52 +253,104 @@ class _SlotParser:
             "block": self.block,
         }
 
+
+def _parse_slot_step_by_step(raw_text: str) -> _Slot:
+    # strips the cell text piece by piece, for cells that do not follow
+    # ``SLOT_GRAMMAR`` exactly
+    course_name = raw_text[: raw_text.find("(")].strip()
+    raw_text = raw_text.replace(course_name, "").strip()
+
+    index = raw_text.find(")")
+    course_type = raw_text[index - 2 : index].strip()
+    raw_text = raw_text.replace(course_type, "").strip()
+
+    course_code = ""
+    if match := COURSE_CODE_REGEX.search(raw_text):
+        course_code = match.group()
+        raw_text = raw_text.replace(course_code, "").strip()
+
+    room = block = ""
+    raw_text = raw_text.replace("GU_", "")
+    if match := ROOM_REGEX.search(raw_text):
+        room = match[0]
+        block = match[1].replace(room, "").strip()
+        raw_text = raw_text.replace(match.group(), "").strip()
+
+    raw_text = raw_text.replace("PR", "").strip().replace("PP", "").strip()
+
+    section = ""
+    if match := SECTION_REGEX.search(raw_text):
+        section = match.group()
+
+    return _Slot(course_name, course_type, course_code, section, room, block)
+
+
+@lru_cache(maxsize=4096)
+def _parse_slot(raw_text: str) -> _Slot:
+    match = SLOT_GRAMMAR.fullmatch(raw_text)
+    if match is None:
+        return _parse_slot_step_by_step(raw_text)
+
+    course_name = match["course_name"]
+    course_type = match["course_type"]
+    # the step by step parser removes every occurrence of the name and the
+    # type, it only agrees with the grammar when both occur once
+    if (
+        not course_name
+        or raw_text.count(course_name) != 1
+        or raw_text.count(course_type) != 1
+    ):
+        return _parse_slot_step_by_step(raw_text)
+
+    return _Slot(
+        course_name,
+        course_type,
+        match["course_code"],
+        match["section"],
+        match["room"],
+        match["block"],
+    )
+
+
+class _SlotParser:
+    __slots__ = ("_raw_text", "_slot")
+
+    def __init__(self, raw_text) -> None:
+        self._raw_text = raw_text
+        self._slot = _parse_slot(raw_text)
+
+    def __repr__(self) -> str:
+        return (
+            f"<SlotParser course_name={self.course_name!r} course_type={self.course_type!r} "
+            f"course_code={self.course_code!r} section={self.section!r} room={self.room!r} block={self.block!r}>"
+        )
+
     @property
-    def sql(self) -> str:
-        return f"""
-            INSERT INTO slots 
-                (course_name, course_type, course_code, section, room, block)
-
-            VALUES 
-                (
-                    {self.course_name!r},
-                    {self.course_type!r},
-                    {self.course_code!r},
-                    {self.section},
-                    {self.room!r},
-                    {self.block!r}
-                )
-
-            ON CONFLICT DO UPDATE SET
-                course_name = {self.course_name!r},
-                course_type = {self.course_type!r},
-                course_code = {self.course_code!r},
-                section = {self.section},
-                room = {self.room!r},
-                block = {self.block!r}
-
-            RETURNING id
-        """
+    def course_name(self) -> str:
+        return self._slot.course_name
 
-    @staticmethod
-    def from_dict_to_sql(data: SlotType) -> str:
-        return f"""
-            INSERT OR REPLACE INTO slots 
-                (course_name, course_type, course_code, section, room, block)
+    @property
+    def course_type(self) -> str:
+        return self._slot.course_type
 
-            VALUES 
-                ({data["course_name"]!r}, {data["course_type"]!r}, {data["course_code"]!r}, {data["section"]}, {data["room"]!r}, {data["block"]!r})
+    @property
+    def course_code(self) -> str:
+        return self._slot.course_code
 
-            ON CONFLICT DO UPDATE SET 
-                course_name = {data["course_name"]!r},
-                course_type = {data["course_type"]!r},
-                course_code = {data["course_code"]!r},
-                section = {data["section"]},
-                room = {data["room"]!r},
-                block = {data["block"]!r}
+    @property
+    def section(self) -> str:
+        return self._slot.section
 
-            RETURNING id
-        """
+    @property
+    def room(self) -> str:
+        return self._slot.room
+
+    @property
+    def block(self) -> str:
+        return self._slot.block
+
+    def to_dict(self) -> SlotType:
+        return self._slot.to_dict()
 
 
 class TimeTableParser(_TimeTableParser):
@@ -304,56 +397,29 @@ class TimeTableParser(_TimeTableParser):
 
     def get_alternative_timetable(self) -> AlternativeArrangement:
         table = self.get_alternative_timetable_details()
-        data: AlternativeArrangement = {
-            "Mon": [],
-            "Tue": [],
-            "Wed": [],
-            "Thu": [],
-            "Fri": [],
-            "Sat": [],
-            "Sun": [],
-        }
+        data: AlternativeArrangement = {day: [] for day in DAYS}  # type: ignore
         for tr in table.find_all("tr")[1:]:
             assert isinstance(tr, Tag)
 
-            day: str = tr.find("td").text.strip()  # type: ignore
-            assert day in {"Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"}
-
-            if day not in data:
-                data[day] = []
-
-            date = tr.find_all("td")[1].text.strip()
-            date_object = datetime.strptime(date, "%Y-%m-%d")
+            cells = _row_cells(tr)
+            day = cells[0]
+            assert day in DAYS
 
-            start_time, end_time = tr.find_all("td")[2].text.strip().split("-")
-            if start_time.strip():
-                start_time_object = date_object + timedelta(
-                    hours=int(start_time.split(":")[0]),
-                    minutes=int(start_time.split(":")[1]),
-                )
-            else:
-                start_time_object = None
-
-            if end_time.strip():
-                end_time_object = date_object + timedelta(
-                    hours=int(end_time.split(":")[0]),
-                    minutes=int(end_time.split(":")[1]),
-                )
-            else:
-                end_time_object = None
+            date_object = _parse_date(cells[1])
+            start_time, end_time = _parse_time_range(cells[2])
 
             data[day].append(
                 {
-                    "date": TimeTableParser._datetime_to_sqlite_string(date_object),
-                    "start_time": TimeTableParser._datetime_to_sqlite_string(
-                        start_time_object
+                    "date": _datetime_to_sqlite_string(date_object),
+                    "start_time": _datetime_to_sqlite_string(
+                        None if start_time is None else date_object + start_time
                     ),
-                    "end_time": TimeTableParser._datetime_to_sqlite_string(
-                        end_time_object
+                    "end_time": _datetime_to_sqlite_string(
+                        None if end_time is None else date_object + end_time
                     ),
-                    "faculty_name": tr.find_all("td")[3].text.strip(),
-                    "alternate_faculty_name": tr.find_all("td")[4].text.strip(),
-                    "slot": _SlotParser(tr.find_all("td")[5].text.strip()).to_dict(),
+                    "faculty_name": cells[3],
+                    "alternate_faculty_name": cells[4],
+                    "slot": _parse_slot(cells[5]).to_dict(),
                     "class": self.class_name,
                 }
             )
@@ -362,55 +428,29 @@ class TimeTableParser(_TimeTableParser):
 
     def get_timetable(self) -> Arrangement:
         table = self.get_timetable_details()
-        data: Arrangement = {
-            "Mon": [],
-            "Tue": [],
-            "Wed": [],
-            "Thu": [],
-            "Fri": [],
-            "Sat": [],
-            "Sun": [],
-        }
+        data: Arrangement = {day: [] for day in DAYS}  # type: ignore
         date_range = self.get_date_range()
         for tr in table.find_all("tr")[1:]:
             assert isinstance(tr, Tag)
 
-            day: str = tr.find("td").text.strip()  # type: ignore
-            assert day in {"Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"}
-
-            if day not in data:
-                data[day] = []
+            cells = _row_cells(tr)
+            day = cells[0]
+            assert day in DAYS
 
             date = date_range[day]
-            start_time, end_time = tr.find_all("td")[1].text.strip().split("-")
-
-            if start_time.strip():
-                start_time_object = date + timedelta(
-                    hours=int(start_time.split(":")[0]),
-                    minutes=int(start_time.split(":")[1]),
-                )
-            else:
-                start_time_object = None
-
-            if end_time.strip():
-                end_time_object = date + timedelta(
-                    hours=int(end_time.split(":")[0]),
-                    minutes=int(end_time.split(":")[1]),
-                )
-            else:
-                end_time_object = None
+            start_time, end_time = _parse_time_range(cells[1])
 
             data[day].append(
                 {
-                    "date": TimeTableParser._datetime_to_sqlite_string(date),
-                    "start_time": TimeTableParser._datetime_to_sqlite_string(
-                        start_time_object
+                    "date": _datetime_to_sqlite_string(date),
+                    "start_time": _datetime_to_sqlite_string(
+                        None if start_time is None else date + start_time
                     ),
-                    "end_time": TimeTableParser._datetime_to_sqlite_string(
-                        end_time_object
+                    "end_time": _datetime_to_sqlite_string(
+                        None if end_time is None else date + end_time
                     ),
-                    "faculty_name": tr.find_all("td")[2].text.strip(),
-                    "slot": _SlotParser(tr.find_all("td")[3].text.strip()).to_dict(),
+                    "faculty_name": cells[2],
+                    "slot": _parse_slot(cells[3]).to_dict(),
                     "class": self.class_name,
                 }
             )
@@ -423,6 +463,85 @@ class TimeTableParser(_TimeTableParser):
             "alternative_timetable": self.get_alternative_timetable(),
         }
 
+    def get_rows(self) -> TimeTableRows:
+        data = self.get_data()
+        return {
+            "timetable": [row for rows in data["timetable"].values() for row in rows],
+            "alternative_timetable": [
+                row for rows in data["alternative_timetable"].values() for row in rows
+            ],
+        }
+
+    @classmethod
+    def parse_many(
+        cls, page_sources: Iterable[str], *, engine: ParserEngine = DEFAULT_ENGINE
+    ) -> TimeTableRows:
+        rows: TimeTableRows = {"timetable": [], "alternative_timetable": []}
+        for page_source in page_sources:
+            page_rows = cls(page_source, engine=engine).get_rows()
+            rows["timetable"].extend(page_rows["timetable"])
+            rows["alternative_timetable"].extend(page_rows["alternative_timetable"])
+
+        return rows
+
+    @staticmethod
+    def _hash_table(table: Tag) -> str:
+        # only the visible text is hashed, markup and attributes may change
+        # between two renders of the same timetable
+        text = "\x1f".join(table.stripped_strings)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_table_hashes(self) -> TimeTableHashes:
+        week = self.get_date_range()["Mon"]
+        return {
+            "class": self.class_name,
+            "week": week.strftime("%Y-%m-%d"),
+            "main_hash": self._hash_table(self.get_main_timetable_details()),
+            "alternative_hash": self._hash_table(
+                self.get_alternative_timetable_details()
+            ),
+            "details_hash": self._hash_table(self.get_timetable_details()),
+        }
+
     @staticmethod
     def _datetime_to_sqlite_string(dt: datetime | None) -> str | None:
-        return None if dt is None else dt.strftime("%Y-%m-%d %H:%M:%S")
+        return _datetime_to_sqlite_string(dt)
+
+
+class AttendanceParser(TableParser):
+    parse_only = SoupStrainer(["h4", "table"])
+
+    @cached_property
+    def class_name(self) -> str:
+        # "Subject Wise Attendance for B.Tech CSE Sem 3"
+        for h4 in self.body.find_all("h4"):
+            if " for " in h4.text:
+                return h4.text.split(" for ")[-1].strip()
+        return ""
+
+    def get_data(self) -> AttendanceGetData:
+        table = self.get_table(0)
+        header = [th.text.strip().lower() for th in table.find_all("th")]
+        columns = {
+            key: header.index(column) for key, column in ATTENDANCE_COLUMNS.items()
+        }
+
+        subjects: list[AttendanceData] = []
+        for tr in table.find_all("tr")[1:]:
+            assert isinstance(tr, Tag)
+
+            cells = _row_cells(tr)
+            if len(cells) != len(header):
+                # summary rows span several columns
+                continue
+
+            subjects.append(
+                {
+                    "course_code": cells[columns["course_code"]],
+                    "course_name": cells[columns["course_name"]],
+                    "total_classes": int(cells[columns["total_classes"]]),
+                    "attended_classes": int(cells[columns["attended_classes"]]),
+                }
+            )
+
+        return {"class": self.class_name, "subjects": subjects}
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import logging
+from typing import Final
+
+from aiosqlite import Connection
+
+# ``init.sql`` creates the original layout (user_version 0), every script
+# below moves the database one version further. Append new migrations, never
+# edit the ones that shipped.
+
+MIGRATIONS: Final[tuple[str, ...]] = (
+    # 1: start and end as integer epoch seconds. The text columns hold the
+    # portal's local time (IST, +05:30), see ``PORTAL_TIMEZONE``.
+    """
+        ALTER TABLE timetable ADD COLUMN start_ts INTEGER;
+        ALTER TABLE timetable ADD COLUMN end_ts INTEGER;
+        ALTER TABLE alternative_timetable ADD COLUMN start_ts INTEGER;
+        ALTER TABLE alternative_timetable ADD COLUMN end_ts INTEGER;
+
+        UPDATE timetable SET
+            start_ts = CAST(strftime('%s', start_time, '-5 hours', '-30 minutes') AS INTEGER),
+            end_ts = CAST(strftime('%s', end_time, '-5 hours', '-30 minutes') AS INTEGER);
+        UPDATE alternative_timetable SET
+            start_ts = CAST(strftime('%s', start_time, '-5 hours', '-30 minutes') AS INTEGER),
+            end_ts = CAST(strftime('%s', end_time, '-5 hours', '-30 minutes') AS INTEGER);
+
+        CREATE INDEX IF NOT EXISTS timetable_class_time ON timetable(class, start_ts, end_ts);
+        CREATE INDEX IF NOT EXISTS timetable_start ON timetable(start_ts);
+        CREATE INDEX IF NOT EXISTS alternative_timetable_class_time ON alternative_timetable(class, start_ts, end_ts);
+        CREATE INDEX IF NOT EXISTS alternative_timetable_start ON alternative_timetable(start_ts);
+        CREATE INDEX IF NOT EXISTS slots_section ON slots(section);
+    """,
+    # 2: when the attendance of a student was last stored, epoch seconds. The
+    # refresh loop only scrapes attendance once it is older than a day.
+    """
+        ALTER TABLE students_credentials ADD COLUMN attendance_refreshed_at INTEGER;
+    """,
+    # 3: the hashes are kept per section, every section of a class is scraped
+    # on its own. The stored hashes are only a cache, they are dropped.
+    """
+        DROP TABLE timetable_hashes;
+
+        CREATE TABLE timetable_hashes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            class TEXT NOT NULL,
+            section INTEGER NOT NULL,
+            week TEXT NOT NULL,
+            main_hash TEXT NOT NULL,
+            alternative_hash TEXT NOT NULL,
+            details_hash TEXT NOT NULL,
+
+            UNIQUE(class, section, week)
+        );
+    """,
+)
+
+log = logging.getLogger("__name__")
+
+
+async def migrate(connection: Connection) -> int:
+    cursor = await connection.cursor()
+    cur = await cursor.execute("PRAGMA user_version")
+    (version,) = await cur.fetchone()  # type: ignore
+
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        log.info("migrating database from version %s to %s", number - 1, number)
+        # user_version lives in the database header, it is committed (or
+        # rolled back) together with the migration itself
+        try:
+            await cursor.executescript(
+                f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;"
+            )
+        except Exception:
+            await connection.rollback()
+            raise
+
+    return len(MIGRATIONS)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import pathlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Concatenate,
+    Final,
+    ParamSpec,
+    TypeVar,
+)
+
+import aiosqlite
+from aiosqlite import Connection
+
+if TYPE_CHECKING:
+    WriteItem = tuple[
+        Callable[..., Awaitable[Any]],
+        tuple[Any, ...],
+        dict[str, Any],
+        asyncio.Future[Any],
+    ]
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+log = logging.getLogger("__name__")
+
+# WAL lets the readers keep reading the last committed state while the writer
+# has a transaction open. Writes are committed in groups, so the writer can
+# afford ``synchronous = FULL``: a commit is on disk once its future resolves.
+WRITER_PRAGMAS: Final[dict[str, str | int]] = {
+    "journal_mode": "WAL",
+    "synchronous": "FULL",
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -32 * 1024,  # in KiB
+    "busy_timeout": 5000,
+}
+READER_PRAGMAS: Final[dict[str, str | int]] = {
+    "query_only": "ON",
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -8 * 1024,
+    "busy_timeout": 5000,
+}
+READERS: Final[int] = 4
+
+# a group is committed once it holds GROUP_SIZE writes or GROUP_WINDOW seconds
+# passed since its first write, whichever comes first
+GROUP_SIZE: Final[int] = 64
+GROUP_WINDOW: Final[float] = 0.05
+
+
+async def _apply_pragmas(connection: Connection, pragmas: dict[str, str | int]) -> None:
+    for name, value in pragmas.items():
+        await connection.execute(f"PRAGMA {name} = {value}")
+
+
+async def _nothing(connection: Connection) -> None: ...
+
+
+def _fail(futures: list[asyncio.Future[Any]], exception: BaseException) -> None:
+    for future in futures:
+        if future.done():
+            continue
+        if isinstance(exception, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exception)
+
+
+# One writer connection fed by a queue and a pool of read-only connections.
+# Every write runs on the writer, one after another, so the transactions of
+# concurrent ingests never interleave and reads never wait for them.
+class Storage:
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        readers: int = READERS,
+        group_size: int = GROUP_SIZE,
+        group_window: float = GROUP_WINDOW,
+    ) -> None:
+        self.path = path
+        self.readers = readers
+        self.group_size = group_size
+        self.group_window = group_window
+
+        self.writes = 0
+        self.commits = 0
+
+        self._writer: Connection | None = None
+        self._writer_task: asyncio.Task[None] | None = None
+        self._writes: asyncio.Queue[WriteItem | None] = asyncio.Queue()
+
+        self._connections: list[Connection] = []
+        self._idle: asyncio.Queue[Connection] = asyncio.Queue()
+
+    def __repr__(self) -> str:
+        return (
+            f"<Storage path={self.path} readers={self.readers} "
+            f"idle={self._idle.qsize()} queued_writes={self._writes.qsize()} "
+            f"writes={self.writes} commits={self.commits}>"
+        )
+
+    async def open(self, *setup: Callable[[Connection], Awaitable[Any]]) -> None:
+        # the writer creates the file and switches it to WAL before any
+        # read-only connection is opened. ``setup`` runs on the writer before
+        # the queue starts, e.g. to create the schema.
+        # transactions are managed by the writer loop, not by sqlite3
+        self._writer = await aiosqlite.connect(self.path, isolation_level=None)
+        await _apply_pragmas(self._writer, WRITER_PRAGMAS)
+        for func in setup:
+            await func(self._writer)
+        self._writer_task = asyncio.create_task(self._write_forever())
+
+        for _ in range(self.readers):
+            connection = await aiosqlite.connect(f"file:{self.path}?mode=ro", uri=True)
+            await _apply_pragmas(connection, READER_PRAGMAS)
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            # the writer commits everything queued before the sentinel
+            self._writes.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+
+        for connection in self._connections:
+            await connection.close()
+        self._connections.clear()
+
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> AsyncIterator[Connection]:
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def read(
+        self,
+        func: Callable[Concatenate[Connection, P], Awaitable[T]],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        async with self.reader() as connection:
+            return await func(connection, *args, **kwargs)
+
+    async def write(
+        self,
+        func: Callable[Concatenate[Connection, P], Awaitable[T]],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        # resolves with the result of ``func`` once the group it ran in is
+        # committed. ``func`` must not commit or roll back by itself.
+        if self._writer_task is None:
+            raise RuntimeError("Storage is not open")
+        if self._writer_task.done():
+            raise RuntimeError("Storage writer stopped")
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((func, args, kwargs, future))
+        return await future
+
+    async def flush(self) -> None:
+        # every write queued before this call is committed when it returns
+        await self.write(_nothing)
+
+    async def _write_forever(self) -> None:
+        try:
+            closing = False
+            while not closing:
+                item = await self._writes.get()
+                if item is None:
+                    break
+                closing = await self._write_group(item)
+        finally:
+            # nothing is left to run what is still queued
+            while not self._writes.empty():
+                if (item := self._writes.get_nowait()) is not None:
+                    _fail([item[3]], RuntimeError("Storage writer stopped"))
+
+    async def _write_group(self, item: WriteItem) -> bool:
+        # runs ``item`` and whatever is queued within the group window in one
+        # transaction, returns True when the queue was closed meanwhile
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        done: list[tuple[asyncio.Future[Any], Any]] = []
+        applied = 0
+        closing = False
+
+        try:
+            await self._execute("BEGIN")
+            while True:
+                await self._apply(item, done)
+                applied += 1
+                if applied >= self.group_size:
+                    break
+
+                timeout = self.group_window - (loop.time() - started)
+                if timeout <= 0:
+                    break
+                try:
+                    next_item = await asyncio.wait_for(self._writes.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if next_item is None:
+                    closing = True
+                    break
+                item = next_item
+
+            await self._execute("COMMIT")
+        except BaseException as e:
+            # the whole group is lost, including the write that was running
+            log.exception("writing a group of %s writes failed", applied)
+            _fail([future for future, _ in done] + [item[3]], e)
+            await self._rollback()
+            # only stop when the writer itself is cancelled or the process is
+            # exiting, a write cancelled from inside loses just its group
+            task = asyncio.current_task()
+            if isinstance(e, (KeyboardInterrupt, SystemExit)) or (
+                task is not None and task.cancelling()
+            ):
+                raise
+            return closing
+
+        self.writes += applied
+        self.commits += 1
+        log.debug(
+            "committed %s writes in %.1f ms", applied, (loop.time() - started) * 1000
+        )
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+        return closing
+
+    async def _rollback(self) -> None:
+        assert self._writer is not None
+        try:
+            if self._writer.in_transaction:
+                await self._execute("ROLLBACK")
+        except Exception:
+            log.exception("rolling back failed")
+
+    async def _execute(self, query: str) -> None:
+        assert self._writer is not None
+        await self._writer.execute(query)
+
+    async def _apply(
+        self, item: WriteItem, done: list[tuple[asyncio.Future[Any], Any]]
+    ) -> None:
+        func, args, kwargs, future = item
+        if future.done():
+            return
+
+        # a failing write only rolls back itself, not the rest of its group
+        await self._execute("SAVEPOINT write")
+        try:
+            result = await func(self._writer, *args, **kwargs)
+        except Exception as e:
+            await self._execute("ROLLBACK TO write")
+            await self._execute("RELEASE write")
+            if not future.cancelled():
+                future.set_exception(e)
+        else:
+            await self._execute("RELEASE write")
+            done.append((future, result))
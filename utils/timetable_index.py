@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import logging
+from array import array
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from aiosqlite import Connection
+
+from .database import PORTAL_TIMEZONE, get_student_sections, get_timetable_rows
+
+if TYPE_CHECKING:
+    from .typehints import TimeTableReturnData
+
+    SectionKey = tuple[str, int]
+
+log = logging.getLogger("__name__")
+
+
+class SectionTimetable:
+    # the slots of one class and section sorted by start, ``starts`` and
+    # ``ends`` are epoch seconds parallel to ``rows``
+    __slots__ = ("starts", "ends", "rows", "longest", "version")
+
+    def __init__(self, slots: list[tuple[int, int, TimeTableReturnData]]) -> None:
+        # a stable sort, slots starting together keep their insertion order
+        slots.sort(key=lambda slot: slot[0])
+        self.starts = array("q", (start for start, _, _ in slots))
+        self.ends = array("q", (end for _, end, _ in slots))
+        self.rows = [row for _, _, row in slots]
+        self.longest = max((end - start for start, end, _ in slots), default=0)
+        self.version = self._version()
+
+    def __repr__(self) -> str:
+        return f"<SectionTimetable slots={len(self.rows)}>"
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _version(self) -> str:
+        # a digest of the content, it only changes when the slots do and is
+        # the same across restarts
+        data = json.dumps(
+            [list(self.starts), list(self.ends), self.rows],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+    def current(self, now: int) -> TimeTableReturnData | None:
+        # the latest started slot that has not ended yet. Only slots starting
+        # within the longest period before ``now`` can still cover it.
+        earliest = now - self.longest
+        for index in range(bisect.bisect_right(self.starts, now) - 1, -1, -1):
+            if self.starts[index] < earliest:
+                break
+            if self.ends[index] >= now:
+                return self.rows[index]
+        return None
+
+    def next(self, now: int) -> TimeTableReturnData | None:
+        index = bisect.bisect_right(self.starts, now)
+        return self.rows[index] if index < len(self.rows) else None
+
+    def between(self, start: int, end: int) -> list[TimeTableReturnData]:
+        first = bisect.bisect_left(self.starts, start)
+        last = bisect.bisect_left(self.starts, end)
+        return self.rows[first:last]
+
+    def arrangement(self, start: int, end: int) -> dict[str, list[TimeTableReturnData]]:
+        # the rows between ``start`` and ``end`` by the weekday they start on
+        # in portal time, with every day of the range present
+        days: dict[str, list[TimeTableReturnData]] = {}
+        for day in range(start, end, 24 * 60 * 60):
+            days[datetime.fromtimestamp(day, PORTAL_TIMEZONE).strftime("%a")] = []
+
+        first = bisect.bisect_left(self.starts, start)
+        last = bisect.bisect_left(self.starts, end)
+        for index in range(first, last):
+            started = datetime.fromtimestamp(self.starts[index], PORTAL_TIMEZONE)
+            days[started.strftime("%a")].append(self.rows[index])
+        return days
+
+    def prune(self, before: int) -> None:
+        index = bisect.bisect_left(self.starts, before)
+        del self.starts[:index]
+        del self.ends[:index]
+        del self.rows[:index]
+        if index:
+            self.version = self._version()
+
+
+def _build(rows: Iterable[tuple]) -> dict[SectionKey, SectionTimetable]:
+    # rows come from ``get_timetable_rows``: main rows first. An alternative
+    # row replaces the main row of the same section and time, or is added as
+    # a slot of its own when there is none. The faculty is not compared, the
+    # portal's "original faculty" text does not always match the main row.
+    slots: dict[SectionKey, list[tuple[int, int, TimeTableReturnData]]] = {}
+    main: dict[tuple, tuple[SectionKey, int]] = {}
+
+    for (
+        alternative,
+        _,
+        class_,
+        section,
+        start_ts,
+        end_ts,
+        start_time,
+        end_time,
+        faculty_name,
+        alternative_faculty_name,
+        course_code,
+        course_name,
+        course_type,
+        room,
+    ) in rows:
+        if start_ts is None or end_ts is None:
+            continue
+
+        key = (class_, section)
+        row: TimeTableReturnData = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "faculty_name": alternative_faculty_name if alternative else faculty_name,
+            "class": class_,
+            "course_code": course_code,
+            "course_name": course_name,
+            "course_type": course_type,
+            "room": room,
+        }
+        section_slots = slots.setdefault(key, [])
+        match = (class_, section, start_ts, end_ts)
+
+        if not alternative:
+            main[match] = (key, len(section_slots))
+            section_slots.append((start_ts, end_ts, row))
+        elif (replaced := main.pop(match, None)) is not None:
+            slots[replaced[0]][replaced[1]] = (start_ts, end_ts, row)
+        else:
+            section_slots.append((start_ts, end_ts, row))
+
+    return {
+        key: SectionTimetable(section_slots) for key, section_slots in slots.items()
+    }
+
+
+class TimetableIndex:
+    # every class and section's slots in memory, plus the class and section
+    # of every student, so a current slot lookup never touches SQLite
+    def __init__(self) -> None:
+        self.lookups = 0
+        self.found = 0
+
+        self._sections: dict[SectionKey, SectionTimetable] = {}
+        self._students: dict[str, SectionKey] = {}
+        # bumped when a reload of the class starts, an older reload that
+        # finishes later is dropped
+        self._versions: dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"<TimetableIndex sections={len(self._sections)} "
+            f"students={len(self._students)}>"
+        )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sections": len(self._sections),
+            "slots": sum(len(section) for section in self._sections.values()),
+            "students": len(self._students),
+            "lookups": self.lookups,
+            "found": self.found,
+        }
+
+    async def load(self, connection: Connection) -> None:
+        self._sections = _build(await get_timetable_rows(connection))
+        self._students = {
+            admission_number: (class_, section)
+            for admission_number, class_, section in await get_student_sections(
+                connection
+            )
+        }
+        log.info(
+            "indexed %s timetable sections of %s students",
+            len(self._sections),
+            len(self._students),
+        )
+
+    async def load_class(self, connection: Connection, class_: str) -> None:
+        version = self._versions[class_] = self._versions.get(class_, 0) + 1
+        sections = _build(await get_timetable_rows(connection, class_=class_))
+        if self._versions[class_] != version:
+            return
+
+        for key in [key for key in self._sections if key[0] == class_]:
+            del self._sections[key]
+        self._sections.update(sections)
+        log.debug("indexed %s sections of %s", len(sections), class_)
+
+    async def load_student(self, connection: Connection, admission_number: str) -> None:
+        students = await get_student_sections(connection, admission_number)
+        if not students:
+            self._students.pop(admission_number, None)
+            return
+
+        _, class_, section = students[0]
+        self._students[admission_number] = (class_, section)
+
+    def remove_student(self, admission_number: str) -> None:
+        self._students.pop(admission_number, None)
+
+    def get(self, admission_number: str) -> SectionTimetable | None:
+        key = self._students.get(admission_number)
+        return None if key is None else self._sections.get(key)
+
+    def current(self, admission_number: str, now: int) -> TimeTableReturnData | None:
+        self.lookups += 1
+        section = self.get(admission_number)
+        row = None if section is None else section.current(now)
+        if row is not None:
+            self.found += 1
+        return row
+
+    def current_many(
+        self, admission_numbers: Iterable[str], now: int
+    ) -> Iterator[tuple[str, TimeTableReturnData | None]]:
+        # students of the same class and section share one lookup
+        rows: dict[SectionKey, TimeTableReturnData | None] = {}
+        for admission_number in admission_numbers:
+            self.lookups += 1
+            key = self._students.get(admission_number)
+            if key is None:
+                yield admission_number, None
+                continue
+
+            if key not in rows:
+                section = self._sections.get(key)
+                rows[key] = None if section is None else section.current(now)
+            if rows[key] is not None:
+                self.found += 1
+            yield admission_number, rows[key]
+
+    def prune(self, before: int) -> None:
+        for section in self._sections.values():
+            section.prune(before)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Literal, TypedDict
 
+ParserEngine = Literal["full", "strained"]
+
 ProfileType = TypedDict(
     "ProfileType",
     {
@@ -52,6 +54,7 @@ AlternativeArrangementData = TypedDict(
         "faculty_name": str,
         "alternate_faculty_name": str,
         "slot": SlotType,
+        "class": str,
     },
 )
 
@@ -111,6 +114,45 @@ TimeTableGetData = TypedDict(
     },
 )
 
+TimeTableRows = TypedDict(
+    "TimeTableRows",
+    {
+        "timetable": list[ArrangementData],
+        "alternative_timetable": list[AlternativeArrangementData],
+    },
+)
+
+AttendanceData = TypedDict(
+    "AttendanceData",
+    {
+        "course_code": str,
+        "course_name": str,
+        "total_classes": int,
+        "attended_classes": int,
+    },
+)
+
+AttendanceGetData = TypedDict(
+    "AttendanceGetData",
+    {
+        "class": str,
+        "subjects": list[AttendanceData],
+    },
+)
+
+AttendanceReturnData = TypedDict(
+    "AttendanceReturnData",
+    {
+        "class": str,
+        "section": int,
+        "course_code": str,
+        "course_name": str | None,
+        "total_classes": int,
+        "attended_classes": int,
+        "percentage": float,
+    },
+)
+
 TimeTableReturnData = TypedDict(
     "TimeTableReturnData",
     {
@@ -124,3 +166,24 @@ TimeTableReturnData = TypedDict(
         "room": str,
     },
 )
+
+TimeTableHashes = TypedDict(
+    "TimeTableHashes",
+    {
+        "class": str,
+        "week": str,
+        "main_hash": str,
+        "alternative_hash": str,
+        "details_hash": str,
+    },
+)
+
+RetentionReport = TypedDict(
+    "RetentionReport",
+    {
+        "before": int,
+        "removed": dict[str, int],
+        "archived": int,
+        "seconds": float,
+    },
+)